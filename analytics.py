@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Vectorised rating analytics over the episode dataset
+
+The dataset is loaded into NumPy arrays once. Every aggregate is then
+computed as a group-by over integer group codes: sums and counts with
+np.bincount, and min/median/max from one lexsort by (group, rating).
+This yields:
+
+- per-season and overall rating mean, median, min, max and vote-weighted mean
+- the same aggregates per director and per writer (shared credits count for everyone named)
+- per-year mean ratings and the least-squares rating trend across air dates
+
+The results are written to <basename>.summary.json, which the scraper's
+summary printout and the visualization both read.
+
+    python3 analytics.py [curb_episodes_with_credits.csv]
+"""
+
+import datetime
+import json
+import logging
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from curb.config import configure_logging
+from curb.summary import FORMAT_VERSION, print_summary
+from dataset_io import iter_csv, write_if_changed
+from episode import Episode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASENAME = 'curb_episodes_with_credits'
+DAYS_PER_YEAR = 365.2425
+
+
+def _round(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+class EpisodeArrays:
+    """
+    Column arrays for a list of episodes; missing ratings are NaN, missing votes 0
+    """
+
+    def __init__(self, episodes: List[Episode]):
+        self.episodes = episodes
+        self.season = np.array([episode.season for episode in episodes], dtype=np.int64)
+        self.rating = np.array([np.nan if episode.rating is None else episode.rating for episode in episodes],
+                               dtype=np.float64)
+        self.votes = np.array([episode.votes or 0 for episode in episodes], dtype=np.float64)
+        self.air_day = np.array([episode.air_date.toordinal() if episode.air_date else np.nan for episode in episodes],
+                                dtype=np.float64)
+
+
+def group_stats(groups: np.ndarray, rating: np.ndarray, votes: np.ndarray, group_count: int) -> Dict[str, np.ndarray]:
+    """
+    Rating aggregates for every group code in range(group_count), in one pass each
+
+    groups, rating and votes are parallel arrays, one entry per (group, episode)
+    pair. Returns arrays indexed by group code; groups without ratings get NaN.
+    """
+    rated = ~np.isnan(rating)
+    episodes = np.bincount(groups, minlength=group_count)
+    rated_groups, rated_rating, rated_votes = groups[rated], rating[rated], votes[rated]
+    counts = np.bincount(rated_groups, minlength=group_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(rated_groups, weights=rated_rating, minlength=group_count) / counts
+        vote_total = np.bincount(rated_groups, weights=rated_votes, minlength=group_count)
+        weighted = np.bincount(rated_groups, weights=rated_rating * rated_votes, minlength=group_count) / vote_total
+
+    # Sorting by (group, rating) puts each group's ratings in one ascending run
+    order = np.lexsort((rated_rating, rated_groups))
+    sorted_rating = rated_rating[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_ratings = counts > 0
+    minimum = np.full(group_count, np.nan)
+    maximum = np.full(group_count, np.nan)
+    median = np.full(group_count, np.nan)
+    first = starts[has_ratings]
+    last = first + counts[has_ratings] - 1
+    minimum[has_ratings] = sorted_rating[first]
+    maximum[has_ratings] = sorted_rating[last]
+    median[has_ratings] = (sorted_rating[first + (last - first) // 2] + sorted_rating[first + (last - first + 1) // 2]) / 2
+
+    return {
+        'episodes': episodes,
+        'rated': counts,
+        'mean': mean,
+        'median': median,
+        'min': minimum,
+        'max': maximum,
+        'weighted_mean': weighted,
+        'total_votes': np.bincount(groups, weights=votes, minlength=group_count),
+    }
+
+
+def _stat_rows(labels: List, key: str, stats: Dict[str, np.ndarray]) -> List[Dict]:
+    rows = []
+    for code, label in enumerate(labels):
+        rows.append({
+            key: label,
+            'episodes': int(stats['episodes'][code]),
+            'rated': int(stats['rated'][code]),
+            'mean': _round(stats['mean'][code]),
+            'median': _round(stats['median'][code]),
+            'min': _round(stats['min'][code]),
+            'max': _round(stats['max'][code]),
+            'weighted_mean': _round(stats['weighted_mean'][code]),
+            'total_votes': int(stats['total_votes'][code]),
+        })
+    return rows
+
+
+def _person_stats(arrays: EpisodeArrays, field: str) -> List[Dict]:
+    """
+    Aggregates per credited person, most episodes first
+    """
+    names: Dict[str, int] = {}
+    codes, rows = [], []
+    for row, episode in enumerate(arrays.episodes):
+        for name in (getattr(episode, field) or '').split(','):
+            name = name.strip()
+            if name:
+                codes.append(names.setdefault(name, len(names)))
+                rows.append(row)
+    if not names:
+        return []
+    rows = np.array(rows, dtype=np.int64)
+    stats = group_stats(np.array(codes, dtype=np.int64), arrays.rating[rows], arrays.votes[rows], len(names))
+    people = _stat_rows(list(names), 'name', stats)
+    return sorted(people, key=lambda person: (-person['episodes'], person['name']))
+
+
+def _trend(arrays: EpisodeArrays) -> Dict:
+    """
+    Per-year mean ratings and the least-squares rating slope per year of air date
+    """
+    dated = ~np.isnan(arrays.rating) & ~np.isnan(arrays.air_day)
+    if not dated.any():
+        return {'by_year': [], 'slope_per_year': None}
+    days = arrays.air_day[dated]
+    rating = arrays.rating[dated]
+    years = np.array([datetime.date.fromordinal(int(day)).year for day in days], dtype=np.int64)
+    unique_years, year_codes = np.unique(years, return_inverse=True)
+    stats = group_stats(year_codes, rating, arrays.votes[dated], len(unique_years))
+    by_year = [{'year': int(year), 'episodes': int(stats['rated'][code]), 'mean': _round(stats['mean'][code])}
+               for code, year in enumerate(unique_years)]
+    slope = None
+    if np.ptp(days) > 0:
+        slope = float(np.polyfit(days / DAYS_PER_YEAR, rating, 1)[0])
+    return {'by_year': by_year, 'slope_per_year': None if slope is None else round(slope, 4)}
+
+
+def _episode_ref(episode: Episode) -> Dict:
+    return {'season': episode.season, 'episode': episode.episode, 'title': episode.title, 'rating': episode.rating}
+
+
+def summarize(episodes: Iterable[Episode]) -> Dict:
+    """
+    Compute the full summary document for a list of episodes
+    """
+    episodes = list(episodes)
+    arrays = EpisodeArrays(episodes)
+    seasons, season_codes = np.unique(arrays.season, return_inverse=True)
+    season_stats = group_stats(season_codes, arrays.rating, arrays.votes, len(seasons))
+    overall = group_stats(np.zeros(len(episodes), dtype=np.int64), arrays.rating, arrays.votes, 1)
+
+    rated = ~np.isnan(arrays.rating)
+    highest = lowest = None
+    if rated.any():
+        # nanargmax/nanargmin return the first of equal ratings, matching max()/min() over the list
+        highest = _episode_ref(episodes[int(np.nanargmax(arrays.rating))])
+        lowest = _episode_ref(episodes[int(np.nanargmin(arrays.rating))])
+
+    return {
+        'version': FORMAT_VERSION,
+        'overall': _stat_rows(['all'], 'scope', overall)[0] if episodes else None,
+        'seasons': _stat_rows([int(season) for season in seasons], 'season', season_stats),
+        'directors': _person_stats(arrays, 'director'),
+        'writers': _person_stats(arrays, 'writer'),
+        'trend': _trend(arrays),
+        'highest_rated': highest,
+        'lowest_rated': lowest,
+    }
+
+
+def write_summary(episodes: Iterable[Episode], basename: str = DEFAULT_BASENAME) -> Dict:
+    """
+    Summarize episodes into <basename>.summary.json, leaving the file alone if
+    unchanged. Returns the summary.
+    """
+    summary = summarize(episodes)
+    path = f'{basename}.summary.json'
+    if write_if_changed(path, json.dumps(summary, indent=2, ensure_ascii=False) + '\n'):
+        logger.info(f"Saved rating summary to {path}")
+    return summary
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else f'{DEFAULT_BASENAME}.csv'
+    basename = csv_path[:-4] if csv_path.endswith('.csv') else csv_path
+    summary = write_summary(iter_csv(csv_path), basename)
+    print_summary(summary, title="EPISODE RATING SUMMARY")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
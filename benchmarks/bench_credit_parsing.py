@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark credit extraction on the saved episode_page.html
+
+Compares the __NEXT_DATA__ JSON path against the DOM-walking heuristic it
+replaced and prints the per-page speedup.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from credit_parser import _credits_from_dom, _credits_from_next_data
+
+PAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'episode_page.html')
+
+
+def time_per_call(fn, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(content)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    with open(PAGE_PATH, 'rb') as f:
+        content = f.read()
+
+    print(f"Page size: {len(content) / 1024:.0f} KiB")
+    print(f"__NEXT_DATA__ credits: {_credits_from_next_data(content)}")
+    print(f"DOM heuristic credits: {_credits_from_dom(content)}")
+
+    json_time = time_per_call(_credits_from_next_data, content, 50)
+    dom_time = time_per_call(_credits_from_dom, content, 3)
+
+    print(f"\n__NEXT_DATA__ path: {json_time * 1000:8.2f} ms/page")
+    print(f"DOM heuristic:      {dom_time * 1000:8.2f} ms/page")
+    print(f"Speedup:            {dom_time / json_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
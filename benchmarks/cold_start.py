@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Cold-start timings for the quick curb subcommands
+
+Each run starts a fresh interpreter, as a user would:
+
+- summary: `python3 -m curb summary` from start to exit, with a current summary file
+- serve: `python3 -m curb serve` from start until its port accepts connections
+- import: the interpreter alone (`python3 -c pass`), for reference
+
+The best of several runs counts. The script also checks that loading the
+summary and serve modules leaves requests, bs4 and numpy unimported, and
+exits with status 1 if one of them is imported or a timing is over budget.
+
+    python3 benchmarks/cold_start.py
+    python3 benchmarks/cold_start.py --repeat 10 --budget-ms 150
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_REPEAT = 7
+# Generous next to the ~50 ms these take on a laptop, but far below what the heavy imports cost
+DEFAULT_BUDGET_MS = 250
+HEAVY_MODULES = ('requests', 'bs4', 'numpy')
+LIGHT_MODULES = ('curb.summary', 'start_server')
+SERVE_PORT = 8765
+SERVE_TIMEOUT = 10.0
+
+
+def time_exit(args: List[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=True)
+    return time.perf_counter() - started
+
+
+def time_listening(args: List[str], port: int) -> float:
+    """
+    Seconds from starting the server until it accepts a connection
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, cwd=ROOT_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < SERVE_TIMEOUT:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.05).close()
+                return time.perf_counter() - started
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"server exited with status {process.returncode} before listening")
+                time.sleep(0.002)
+        raise RuntimeError(f"server did not listen on port {port} within {SERVE_TIMEOUT:.0f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def heavy_imports(modules) -> List[str]:
+    """
+    The HEAVY_MODULES a fresh interpreter has loaded after importing modules
+    """
+    code = (f"import importlib, sys\n"
+            f"for name in {list(modules)!r}: importlib.import_module(name)\n"
+            f"print(' '.join(name for name in {list(HEAVY_MODULES)!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Measure cold-start time of curb summary and curb serve")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"runs per command; the best counts (default: {DEFAULT_REPEAT})")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"slowest acceptable start for summary and serve (default: {DEFAULT_BUDGET_MS:.0f})")
+    parser.add_argument('--port', type=int, default=SERVE_PORT, help=f"port for the serve runs (default: {SERVE_PORT})")
+    args = parser.parse_args(argv)
+
+    timings = {
+        'python -c pass': min(time_exit(['-c', 'pass']) for _ in range(args.repeat)),
+        'curb summary': min(time_exit(['-m', 'curb', 'summary']) for _ in range(args.repeat)),
+        'curb serve': min(time_listening(['-m', 'curb', 'serve', '--no-browser', '--port', str(args.port)], args.port)
+                          for _ in range(args.repeat)),
+    }
+    print(f"{'command':<22}{'cold start ms':>14}")
+    for command, seconds in timings.items():
+        print(f"{command:<22}{seconds * 1000:>14.1f}")
+
+    problems = [f"{command} took {seconds * 1000:.0f} ms, over the {args.budget_ms:.0f} ms budget"
+                for command, seconds in timings.items()
+                if command.startswith('curb') and seconds * 1000 > args.budget_ms]
+    loaded = heavy_imports(LIGHT_MODULES)
+    if loaded:
+        problems.append(f"importing {', '.join(LIGHT_MODULES)} also imports {', '.join(loaded)}")
+    if problems:
+        print(f"\n{len(problems)} problem(s):")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"\nBoth start within {args.budget_ms:.0f} ms without importing {', '.join(HEAVY_MODULES)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the scrape and render hot paths
+
+Every benchmark runs against checked-in inputs, so no network is needed:
+
+- fixtures/season_page.html: a synthetic season listing page (see the note
+  at its top) in IMDB's episode card markup
+- ../episode_page.html: a saved IMDB episode page
+- ../curb_episodes_with_credits.csv: the dataset, for the writers and aggregation
+
+Each benchmark runs at 1x, 10x and 100x its base input: the season page with
+its episode cards repeated, the episode page parsed that many times, or the
+dataset repeated under new season numbers. Wall time is the best of several
+runs. Peak memory comes from a separate tracemalloc run, because tracing
+slows the code it measures.
+
+Results are compared against baseline.json. A benchmark that got slower or
+used more memory than the threshold allows is flagged, and the script
+exits with status 1. The baseline is machine-specific; refresh it with
+--update-baseline after an intended change or on new hardware.
+
+    python3 benchmarks/run_benchmarks.py
+    python3 benchmarks/run_benchmarks.py --scales 1 10 --only parse_season_page
+    python3 benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from analytics import summarize
+from credit_parser import extract_credits
+from dataset_io import iter_csv, render_csv, render_json
+from season_parser import extract_episode_data, iter_episode_containers, parse_season_page
+
+SEASON_PAGE_PATH = os.path.join(BENCH_DIR, 'fixtures', 'season_page.html')
+EPISODE_PAGE_PATH = os.path.join(BENCH_DIR, '..', 'episode_page.html')
+DATASET_PATH = os.path.join(BENCH_DIR, '..', 'curb_episodes_with_credits.csv')
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_REPEAT = 5
+# Allowed slowdown or memory growth over the baseline before a result is flagged
+DEFAULT_THRESHOLD = 0.25
+# Differences this small are mostly noise and are never flagged
+MIN_FLAGGED_SECONDS = 0.002
+MIN_FLAGGED_BYTES = 64 * 1024
+FIXTURE_SEASON = 2
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable  # scale -> input
+    run: Callable    # input -> anything
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def scaled_season_page(scale: int) -> bytes:
+    """
+    The season fixture with its episode cards repeated scale times
+    """
+    content = _read(SEASON_PAGE_PATH)
+    start = content.index(b'<section>') + len(b'<section>')
+    end = content.index(b'</section>')
+    return content[:start] + content[start:end] * scale + content[end:]
+
+
+def scaled_dataset(scale: int) -> List:
+    """
+    The dataset repeated scale times, each copy under its own season numbers
+    """
+    episodes = list(iter_csv(DATASET_PATH))
+    seasons = max(episode.season for episode in episodes)
+    return [episode.replace(season=episode.season + copy * seasons)
+            for copy in range(scale) for episode in episodes]
+
+
+def _extract_all(containers: List) -> None:
+    for container in containers:
+        extract_episode_data(container, FIXTURE_SEASON)
+
+
+def _extract_credits_all(pages: List[bytes]) -> None:
+    for content in pages:
+        extract_credits(content)
+
+
+BENCHMARKS = [
+    Benchmark('extract_episode_data',
+              lambda scale: list(iter_episode_containers(scaled_season_page(scale))), _extract_all),
+    Benchmark('parse_season_page', scaled_season_page, lambda content: parse_season_page(content, FIXTURE_SEASON)),
+    Benchmark('extract_credits', lambda scale: [_read(EPISODE_PAGE_PATH)] * scale, _extract_credits_all),
+    Benchmark('render_csv', scaled_dataset, render_csv),
+    Benchmark('render_json', scaled_dataset, render_json),
+    Benchmark('season_aggregation', scaled_dataset, summarize),
+]
+
+
+def measure(benchmark: Benchmark, scale: int, repeat: int) -> Dict[str, float]:
+    """
+    Best wall time over repeat runs, and the tracemalloc peak of one more run
+    """
+    data = benchmark.setup(scale)
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        benchmark.run(data)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.run(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(best, 6), 'peak_bytes': peak}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Descriptions of every result that regressed beyond threshold
+    """
+    regressions = []
+    for name, scales in results.items():
+        for scale, result in scales.items():
+            base = baseline.get(name, {}).get(scale)
+            if not base:
+                continue
+            if (result['seconds'] > base['seconds'] * (1 + threshold)
+                    and result['seconds'] - base['seconds'] > MIN_FLAGGED_SECONDS):
+                regressions.append(f"{name} @ {scale}x: {result['seconds'] * 1000:.2f} ms "
+                                   f"vs baseline {base['seconds'] * 1000:.2f} ms")
+            if (result['peak_bytes'] > base['peak_bytes'] * (1 + threshold)
+                    and result['peak_bytes'] - base['peak_bytes'] > MIN_FLAGGED_BYTES):
+                regressions.append(f"{name} @ {scale}x: peak {result['peak_bytes'] / 1024:.0f} KiB "
+                                   f"vs baseline {base['peak_bytes'] / 1024:.0f} KiB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Run the offline benchmarks and compare against a baseline")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help=f"dataset multipliers to run (default: {' '.join(map(str, DEFAULT_SCALES))})")
+    parser.add_argument('--only', nargs='+', choices=[benchmark.name for benchmark in BENCHMARKS],
+                        help="run only these benchmarks")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"timed runs per benchmark; the best counts (default: {DEFAULT_REPEAT})")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="baseline results file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed fractional regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--update-baseline', action='store_true', help="write these results as the new baseline")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    print(f"{'benchmark':<22}{'scale':>6}{'wall ms':>12}{'peak KiB':>12}")
+    for benchmark in BENCHMARKS:
+        if args.only and benchmark.name not in args.only:
+            continue
+        for scale in args.scales:
+            result = measure(benchmark, scale, args.repeat)
+            results.setdefault(benchmark.name, {})[str(scale)] = result
+            print(f"{benchmark.name:<22}{scale:>5}x{result['seconds'] * 1000:>12.2f}{result['peak_bytes'] / 1024:>12.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+    if args.update_baseline:
+        # Merge, so a partial run only replaces the results it measured
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        for name, scales in results.items():
+            baseline.setdefault(name, {}).update(scales)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
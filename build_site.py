@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Static site build for the visualization
+
+Served from the repo, the page loads in a waterfall: the HTML, then Chart.js
+from a CDN, then the columnar data and summary, and only then the first
+chart. This script writes a self-contained dist/ directory instead:
+
+- index.html carries the columnar data and rating summary for the first
+  render inline, as a JSON script block. It also carries the statistics
+  panel and the first screen of both tables pre-rendered, so they show
+  before any script runs. The page adopts those rows instead of rebuilding
+  them.
+- The page script, Chart.js and PapaParse become same-origin files under
+  assets/, loaded with defer so they download while the HTML is parsed.
+  The libraries are downloaded once into vendor/ and reused from there.
+- Assets are minified and named by content hash (app.3f9c2a1b7e.js), so
+  they can be cached forever. index.html and the CSV keep their names.
+- Every compressible file gets .gz and, with the optional brotli package,
+  .br siblings for servers that send precompressed files.
+
+    python3 build_site.py                      # -> dist/
+    python3 build_site.py --out public --refresh-vendor
+    python3 start_server.py --directory dist   # try the build locally
+"""
+
+import argparse
+import datetime
+import decimal
+import gzip
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Dict, List, Optional
+
+import requests
+
+from analytics import summarize
+from columnar import build_columns
+from curb.config import configure_logging
+from dataset_io import iter_csv
+from episode import Episode
+from search_index import SearchIndex
+from start_server import BROTLI_MAX_QUALITY_SIZE, COMPRESSIBLE_EXTENSIONS, MIN_COMPRESS_SIZE
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip siblings are always written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PAGE = os.path.join(ROOT_DIR, 'curb_episodes_visualization.html')
+DATA_BASENAME = 'curb_episodes_with_credits'
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, 'dist')
+DEFAULT_VENDOR_DIR = os.path.join(ROOT_DIR, 'vendor')
+ASSETS_DIR = 'assets'
+HASH_LENGTH = 10
+# Rows of each table rendered into the HTML; the page renders the rest
+PRERENDER_ROWS = 20
+
+# CDN URLs the page loads -> file name of the local copy in the vendor directory
+VENDOR_LIBRARIES = {
+    'https://cdn.jsdelivr.net/npm/chart.js': 'chart.umd.js',
+    'https://cdn.jsdelivr.net/npm/papaparse@5.4.1/papaparse.min.js': 'papaparse.min.js',
+}
+
+_CDN_SCRIPT_RE = re.compile(r'<script src="(https://[^"]+)"></script>')
+_APP_SCRIPT_RE = re.compile(r'\s*<script>(.*?)</script>\s*(?=</body>)', re.S)
+_STYLE_RE = re.compile(r'<style>(.*?)</style>', re.S)
+_HTML_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+
+
+# Minification. Deliberately conservative: only whitespace and comments that
+# cannot be inside a string are removed, so no JS or CSS parser is needed.
+
+def minify_js(source: str) -> str:
+    """
+    Drop indentation, blank lines and whole-line // comments; line breaks are kept for ASI
+    """
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def minify_css(source: str) -> str:
+    """
+    Drop comments and the whitespace around braces, semicolons, commas and colons
+    """
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,])\s*', r'\1', source)
+    # "color: red" -> "color:red", leaving selectors such as "a :hover" alone
+    source = re.sub(r'([;{][-\w]+)\s*:\s*', r'\1:', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_html(source: str) -> str:
+    """
+    Drop comments and indentation; whitespace between elements shrinks but never disappears
+    """
+    source = _HTML_COMMENT_RE.sub('', source)
+    return re.sub(r'\s*\n\s*', '\n', source).strip() + '\n'
+
+
+# Server-side rendering of what the page's updateStats(), createDesktopRow()
+# and createMobileItem() produce for the default view (all seasons, dataset order)
+
+def js_number(value: Optional[float]) -> str:
+    """
+    A number as JavaScript's String() prints it
+    """
+    if value is None:
+        return 'NaN'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def js_round(value: float) -> int:
+    # Math.round rounds halves up; round() would round them to even
+    return int(decimal.Decimal(value).to_integral_value(decimal.ROUND_HALF_UP))
+
+
+def to_fixed(value: float, digits: int) -> str:
+    """
+    Number.prototype.toFixed, which rounds exact halves away from zero
+    """
+    return str(decimal.Decimal(value).quantize(decimal.Decimal(1).scaleb(-digits), decimal.ROUND_HALF_UP))
+
+
+def rating_color(rating: Optional[float]) -> str:
+    """
+    Same gradient as getRatingColor() in the page
+    """
+    if rating is None:
+        # getRatingColor(NaN) yields this invalid colour, which the browser ignores
+        return 'rgb(NaN, NaN, NaN)'
+    normalized = max(0.0, min(1.0, (rating - 7.0) / (9.5 - 7.0)))
+    if normalized <= 0.5:
+        ratio = normalized * 2
+        return f'rgb({js_round(180 + 75 * ratio)}, {js_round(50 + 150 * ratio)}, 20)'
+    ratio = (normalized - 0.5) * 2
+    return f'rgb({js_round(255 * (1 - ratio * 0.8))}, {js_round(200 + 55 * ratio)}, {js_round(20 + 100 * ratio)})'
+
+
+def display_air_date(value: Optional[datetime.date]) -> str:
+    # Matches the page's Intl.DateTimeFormat('en-US', {weekday, month: 'short', day, year})
+    return f'{value:%a, %b} {value.day}, {value.year}' if value else ''
+
+
+def display_votes(votes: Optional[int]) -> str:
+    # toLocaleString() in an en-US browser
+    return 'NaN' if votes is None else f'{votes:,}'
+
+
+def render_stats(episodes: List[Episode]) -> str:
+    """
+    The statistics panel for every episode
+    """
+    ratings = [episode.rating for episode in episodes]
+    if not episodes or None in ratings:
+        # The page shows NaN here; leave it to the page rather than guess
+        return ''
+    highest = lowest = episodes[0]
+    for episode in episodes:
+        if episode.rating > highest.rating:
+            highest = episode
+        if episode.rating < lowest.rating:
+            lowest = episode
+
+    def card(heading: str, value: str, label: Optional[str] = None) -> str:
+        label_html = f'<div>{html.escape(label)}</div>' if label is not None else ''
+        return f'<div class="stat-card"><h3>{heading}</h3><div class="stat-value">{value}</div>{label_html}</div>'
+
+    return ''.join([
+        card('Total Episodes', str(len(episodes))),
+        card('Average Rating', to_fixed(sum(ratings) / len(ratings), 2)),
+        card('Highest Rated', js_number(highest.rating), f'S{highest.season}E{highest.episode}: {highest.title}'),
+        card('Lowest Rated', js_number(lowest.rating), f'S{lowest.season}E{lowest.episode}: {lowest.title}'),
+    ])
+
+
+def _text(value) -> str:
+    return html.escape(value or '')
+
+
+def render_desktop_row(episode: Episode) -> str:
+    return (f'<tr data-key="{episode.season}-{episode.episode}">'
+            f'<td class="season-cell">Season {episode.season}</td>'
+            f'<td class="episode-cell">{episode.episode}</td>'
+            f'<td class="title-cell" title="{_text(episode.title)}">{_text(episode.title)}</td>'
+            f'<td class="synopsis-cell">{_text(episode.description)}</td>'
+            f'<td class="rating-cell" style="color: {rating_color(episode.rating)};">{js_number(episode.rating)}</td>'
+            f'<td class="votes-cell">{display_votes(episode.votes)}</td>'
+            f'<td class="director-cell">{_text(episode.director)}</td>'
+            f'</tr>')
+
+
+def render_mobile_item(episode: Episode) -> str:
+    def meta(label: str, value: str, style: str = '') -> str:
+        style_attr = f' style="{style}"' if style else ''
+        return (f'<div class="mobile-table-meta-item"><div class="mobile-table-meta-label">{label}</div>'
+                f'<div class="mobile-table-meta-value"{style_attr}>{value}</div></div>')
+
+    return (f'<div class="mobile-table-item" data-key="{episode.season}-{episode.episode}">'
+            f'<div class="mobile-table-header"><div class="mobile-table-title">{_text(episode.title)}</div>'
+            f'<div class="mobile-table-season">S{episode.season}E{episode.episode}</div></div>'
+            f'<div class="mobile-table-meta">'
+            f'{meta("Rating", js_number(episode.rating), f"color: {rating_color(episode.rating)}; font-weight: 600;")}'
+            f'{meta("Votes", display_votes(episode.votes))}'
+            f'{meta("Director", _text(episode.director))}'
+            f'{meta("Air Date", display_air_date(episode.air_date))}'
+            f'</div><div class="mobile-table-synopsis">{_text(episode.description)}</div></div>')
+
+
+# Assets
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+
+
+def _json_bytes(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def fetch_vendor_library(url: str, vendor_dir: str, refresh: bool = False) -> bytes:
+    """
+    The local copy of a CDN library, downloading it into vendor_dir the first time
+    """
+    path = os.path.join(vendor_dir, VENDOR_LIBRARIES[url])
+    if refresh or not os.path.exists(path):
+        logger.info(f"Downloading {url} to {path}")
+        try:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise RuntimeError(f"Could not download {url} ({e}); save a copy as {path} and build again") from e
+        os.makedirs(vendor_dir, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class SiteWriter:
+    """
+    Writes files under the output directory, each with its compressed siblings
+    """
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.written: Dict[str, int] = {}
+
+    def write(self, relative_path: str, body: bytes) -> str:
+        path = os.path.join(self.out_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+        self.written[relative_path] = len(body)
+        if os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS and len(body) >= MIN_COMPRESS_SIZE:
+            variants = [('.gz', gzip.compress(body, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(body, quality=11 if len(body) <= BROTLI_MAX_QUALITY_SIZE else 6)))
+            for suffix, compressed in variants:
+                # A sibling that is not smaller would never be worth sending
+                if len(compressed) < len(body):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    self.written[relative_path + suffix] = len(compressed)
+        return relative_path
+
+    def write_hashed(self, name: str, body: bytes) -> str:
+        """
+        Write assets/<stem>.<hash><ext> and return its URL relative to index.html
+        """
+        stem, extension = os.path.splitext(name)
+        return self.write(f'{ASSETS_DIR}/{stem}.{content_hash(body)}{extension}', body)
+
+
+def _replace_once(pattern: str, replacement: str, text: str, what: str) -> str:
+    new_text, count = re.subn(pattern, lambda match: replacement, text, count=1, flags=re.S)
+    if not count:
+        raise ValueError(f"Could not find the {what} in {SOURCE_PAGE}; update build_site.py to match the page")
+    return new_text
+
+
+def build_site(out_dir: str = DEFAULT_OUTPUT_DIR, vendor_dir: str = DEFAULT_VENDOR_DIR,
+               refresh_vendor: bool = False) -> Dict[str, int]:
+    """
+    Build the site into out_dir, replacing it. Returns written path -> size in bytes.
+    """
+    episodes = [episode for episode in iter_csv(os.path.join(ROOT_DIR, f'{DATA_BASENAME}.csv'))
+                if episode.season and episode.episode]
+    if not episodes:
+        raise ValueError(f"No episodes in {DATA_BASENAME}.csv")
+    with open(SOURCE_PAGE, encoding='utf-8') as f:
+        page = f.read()
+
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    site = SiteWriter(out_dir)
+
+    # Data the page fetches after the first render, under hashed names
+    assets: Dict[str, str] = {}
+    columns, descriptions = build_columns(episodes, '')
+    columns['descriptions'] = site.write_hashed(f'{DATA_BASENAME}.descriptions.json', _json_bytes(descriptions))
+    index = SearchIndex.build(episodes)
+    assets[f'{DATA_BASENAME}.search.json'] = site.write_hashed(
+        f'{DATA_BASENAME}.search.json',
+        _json_bytes(index.to_json([[episode.season, episode.episode] for episode in episodes])))
+    # Kept under its own name: it is the download people link to, and what start_server's /api/ reads
+    with open(os.path.join(ROOT_DIR, f'{DATA_BASENAME}.csv'), 'rb') as f:
+        site.write(f'{DATA_BASENAME}.csv', f.read())
+
+    for url, name in VENDOR_LIBRARIES.items():
+        assets[url] = site.write_hashed(name, fetch_vendor_library(url, vendor_dir, refresh_vendor))
+
+    # The page script becomes a deferred, hashed file; deferred scripts run in order, after Chart.js
+    app_match = _APP_SCRIPT_RE.search(page)
+    if app_match is None:
+        raise ValueError(f"Could not find the page script in {SOURCE_PAGE}")
+    app_url = site.write_hashed('app.js', minify_js(app_match.group(1)).encode('utf-8'))
+    page = page[:app_match.start()] + '\n' + page[app_match.end():]
+
+    def local_script(match: re.Match) -> str:
+        url = match.group(1)
+        if url not in assets:
+            raise ValueError(f"{SOURCE_PAGE} loads {url}, which is not in VENDOR_LIBRARIES")
+        return f'<script defer src="{assets[url]}"></script>\n<script defer src="{app_url}"></script>'
+    page, count = _CDN_SCRIPT_RE.subn(local_script, page, count=1)
+    if not count:
+        raise ValueError(f"Could not find the Chart.js script tag in {SOURCE_PAGE}")
+    # Start the description download with the page rather than after the script runs
+    page = page.replace('</head>', f'<link rel="preload" href="{columns["descriptions"]}" as="fetch" crossorigin>\n</head>', 1)
+
+    page = _STYLE_RE.sub(lambda match: f'<style>{minify_css(match.group(1))}</style>', page, count=1)
+    page = _replace_once(r'<div class="stats" id="stats"></div>',
+                         f'<div class="stats" id="stats">{render_stats(episodes)}</div>', page, 'statistics panel')
+    first_screen = episodes[:PRERENDER_ROWS]
+    page = _replace_once(r'(<tbody id="episodeTableBody">).*?(</tbody>)',
+                         '<tbody id="episodeTableBody">' + ''.join(map(render_desktop_row, first_screen)) + '</tbody>',
+                         page, 'desktop table body')
+    page = _replace_once(r'<div class="mobile-table" id="mobileTable">\s*<!--.*?-->\s*</div>',
+                         '<div class="mobile-table" id="mobileTable">' + ''.join(map(render_mobile_item, first_screen)) + '</div>',
+                         page, 'mobile table')
+
+    summary = summarize(episodes)
+    build_data = {'columns': columns, 'summary': summary, 'assets': assets}
+    # < keeps any "</script>" inside the data from closing the block early
+    inline = _json_bytes(build_data).decode('utf-8').replace('<', '\\u003c')
+    page = page.replace('</body>', f'<script id="build-data" type="application/json">{inline}</script>\n</body>', 1)
+
+    site.write('index.html', minify_html(page).encode('utf-8'))
+    return site.written
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Build the visualization into a static, precompressed site")
+    parser.add_argument('--out', default=DEFAULT_OUTPUT_DIR, help="output directory, replaced on every build (default: dist)")
+    parser.add_argument('--vendor-dir', default=DEFAULT_VENDOR_DIR,
+                        help="where downloaded copies of the CDN libraries are kept (default: vendor)")
+    parser.add_argument('--refresh-vendor', action='store_true', help="download the CDN libraries again")
+    args = parser.parse_args(argv)
+    if not os.path.exists(SOURCE_PAGE):
+        # Installed with pip, only the modules are copied; the page stays in the checkout
+        parser.error(f"{SOURCE_PAGE} not found; build the site from a checkout of the repository")
+
+    written = build_site(args.out, args.vendor_dir, args.refresh_vendor)
+    for path, size in sorted(written.items()):
+        print(f"  {path:<60}{size / 1024:>9.1f} KiB")
+    print(f"\nBuilt {len(written)} files into {args.out}")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
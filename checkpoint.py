@@ -0,0 +1,134 @@
+"""
+Append-only NDJSON checkpoint journal for long enrichment runs
+
+Each completed episode is written as one typed JSON line and flushed to
+disk immediately, so a killed or crashed run can restart and skip every
+(season, episode) already in the journal. The final CSV/JSON outputs are
+then built from the journal in a single streaming pass.
+"""
+
+import json
+import logging
+import os
+from typing import Callable, Iterator, Set, Tuple
+
+from episode import Episode
+from pipeline import CsvSink, JsonSink
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointJournal:
+    """
+    NDJSON journal of completed episodes
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def iter_episodes(self) -> Iterator[Episode]:
+        """
+        Stream the journalled episodes, ignoring a torn final line from a killed run
+
+        Raises ValueError for an unparsable line anywhere else, since that
+        episode would otherwise drop out of the outputs unnoticed.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # Only the last write of a killed run can lack its newline
+                    if line.endswith('\n'):
+                        raise ValueError(f"Corrupt journal line {line_num} in {self.path}") from None
+                    logger.warning(f"Skipping incomplete journal line {line_num} in {self.path}")
+                    continue
+                yield Episode.from_dict(row)
+
+    def completed_keys(self) -> Set[Tuple[int, int]]:
+        return {episode.key for episode in self.iter_episodes()}
+
+    def append(self, episode: Episode) -> None:
+        """
+        Journal one completed episode and force it to disk
+        """
+        if self._file is None:
+            self._repair_tail()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(episode.to_json_dict(), ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _repair_tail(self) -> None:
+        """
+        Make the journal end with a newline before appending to it
+
+        A run killed mid-write leaves a line without one. If that line is a
+        complete row, it already counts as done, so only the newline is added;
+        a torn fragment is cut off so the next row does not merge into it.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if not data or data.endswith(b'\n'):
+                return
+            start = data.rfind(b'\n') + 1
+            try:
+                json.loads(data[start:])
+            except ValueError:
+                logger.warning(f"Discarding incomplete last line of {self.path}")
+                f.truncate(start)
+            else:
+                f.write(b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def sort(self, key: Callable[[Episode], object]) -> None:
+        """
+        Rewrite the journal in key order, if it is not already
+
+        Episodes that failed in an earlier run are journalled after the ones
+        that follow them in the input, once a later run fetches them.
+        """
+        self.close()
+        episodes = list(self.iter_episodes())
+        ordered = sorted(episodes, key=key)
+        if [episode.key for episode in ordered] == [episode.key for episode in episodes]:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for episode in ordered:
+                f.write(json.dumps(episode.to_json_dict(), ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write_outputs(self, csv_path: str, json_path: str) -> int:
+        """
+        Write the CSV and JSON outputs from the journal in one streaming pass
+
+        Returns the number of episodes written.
+        """
+        sinks = [CsvSink(csv_path), JsonSink(json_path)]
+        count = 0
+        for episode in self.iter_episodes():
+            for sink in sinks:
+                sink.write(episode)
+            count += 1
+        for sink in sinks:
+            sink.close()
+        return count
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Columnar, pre-typed episode data for the visualization
+
+The page used to download the credits CSV, parse it with Papa.parse and
+convert every field by hand. This module writes the same data as two compact
+JSON files instead:
+
+- <basename>.columns.json holds one array per field. Season, episode, rating
+  and votes are numbers, the air date is a day count since 1970-01-01, and
+  director/writer are dictionary-encoded (a list of distinct names plus one
+  index per episode).
+- <basename>.descriptions.json holds the plot descriptions in row order. The
+  page fetches it after the first render.
+
+    python3 columnar.py [curb_episodes_with_credits.csv]
+"""
+
+import datetime
+import json
+import logging
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from curb.config import configure_logging
+from dataset_io import iter_csv, write_if_changed
+from episode import Episode
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_BASENAME = 'curb_episodes_with_credits'
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def _dictionary_encode(values: List[Optional[str]]) -> Dict:
+    """
+    Encode strings as {'values': distinct strings, 'codes': index per row}; None is code -1
+    """
+    index: Dict[str, int] = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+        else:
+            codes.append(index.setdefault(value, len(index)))
+    return {'values': list(index), 'codes': codes}
+
+
+def build_columns(episodes: Iterable[Episode], descriptions_url: str) -> Tuple[Dict, List[str]]:
+    """
+    Build the column document and the description list for a run of episodes
+    """
+    episodes = list(episodes)
+    columns = {
+        'version': FORMAT_VERSION,
+        'count': len(episodes),
+        'season': [episode.season for episode in episodes],
+        'episode': [episode.episode for episode in episodes],
+        'title': [episode.title for episode in episodes],
+        'air_date': [(episode.air_date - _EPOCH).days if episode.air_date else None for episode in episodes],
+        'rating': [episode.rating for episode in episodes],
+        'votes': [episode.votes for episode in episodes],
+        'director': _dictionary_encode([episode.director for episode in episodes]),
+        'writer': _dictionary_encode([episode.writer for episode in episodes]),
+        'descriptions': descriptions_url,
+    }
+    descriptions = [episode.description or '' for episode in episodes]
+    return columns, descriptions
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def write_columnar(episodes: Iterable[Episode], basename: str = DEFAULT_BASENAME) -> bool:
+    """
+    Write <basename>.columns.json and <basename>.descriptions.json
+
+    Files whose content is unchanged are left alone. Returns True if either was written.
+    """
+    descriptions_path = f'{basename}.descriptions.json'
+    # The page resolves the description URL relative to itself, so only the file name is stored
+    columns, descriptions = build_columns(episodes, descriptions_path.rsplit('/', 1)[-1])
+    if not columns['count']:
+        logger.warning("No episodes to write to the columnar files")
+        return False
+    wrote_columns = write_if_changed(f'{basename}.columns.json', _dump(columns))
+    wrote_descriptions = write_if_changed(descriptions_path, _dump(descriptions))
+    if wrote_columns or wrote_descriptions:
+        logger.info(f"Saved {columns['count']} episodes to {basename}.columns.json and {descriptions_path}")
+    return wrote_columns or wrote_descriptions
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else f'{DEFAULT_BASENAME}.csv'
+    basename = csv_path[:-4] if csv_path.endswith('.csv') else csv_path
+    write_columnar(iter_csv(csv_path), basename)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
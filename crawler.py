@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Multi-series IMDB crawler backed by a persistent work queue
+
+Seed it with any number of IMDB title ids. Each series page job discovers
+the season count and queues one job per season. Each season job stores
+the episode listings and queues one job per episode page, and each
+episode page job fills in the credits. Jobs live in a SQLite file (see
+work_queue.py), so several worker processes can drain the queue in
+parallel, on one machine or on several sharing the file, and an
+interrupted crawl resumes where it stopped.
+
+    python3 crawler.py seed tt0264235 tt0098904
+    python3 crawler.py work --processes 4
+    python3 crawler.py refresh --older-than 24   # re-scrape series last crawled a day or more ago
+    python3 crawler.py status
+    python3 crawler.py export tt0098904 -o seinfeld.csv
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from credit_parser import extract_credits, primary_credits
+from curb.config import configure_logging
+from episode import FIELDNAMES, Episode
+from fetcher import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, Fetcher, absolute_url
+from http_cache import HttpCache
+from parse_stage import SERIAL, ParseStage
+from pipeline import CsvSink
+from season_parser import SERIES_EPISODES_URL, parse_season_count, parse_season_page, season_url
+from work_queue import Job, WorkQueue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = 'crawl.sqlite'
+
+
+def episode_page_url(url: str) -> str:
+    """
+    Canonical episode page URL: absolute, with the ref_ tracking query dropped
+    """
+    return absolute_url(urlsplit(url)._replace(query='').geturl())
+
+
+class SeriesCrawler:
+    """
+    Drains the work queue for one worker, storing episodes in the queue database
+    """
+
+    def __init__(self, db_path: str, worker_id: str, fetcher: Optional[Fetcher],
+                 parse_stage: ParseStage = SERIAL):
+        self.worker_id = worker_id
+        self.fetcher = fetcher
+        self.parse_stage = parse_stage
+        self.queue = WorkQueue(db_path)
+        self.conn = self.queue.conn
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS episodes (
+                series TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                episode INTEGER NOT NULL,
+                title TEXT,
+                air_date TEXT,
+                rating REAL,
+                votes INTEGER,
+                description TEXT,
+                director TEXT,
+                writer TEXT,
+                url TEXT,
+                PRIMARY KEY (series, season, episode)
+            )
+        ''')
+
+    def seed(self, title_ids: List[str]) -> None:
+        for title_id in title_ids:
+            url = SERIES_EPISODES_URL.format(title_id=title_id)
+            if self.queue.enqueue('series', url, {'title_id': title_id}):
+                logger.info(f"Queued series {title_id}")
+            else:
+                logger.info(f"Series {title_id} is already queued; use refresh to crawl it again")
+
+    def refresh(self, title_ids: List[str], older_than: float = 0.0) -> int:
+        """
+        Queue the finished pages of already seeded series again, so the next
+        work run re-scrapes their ratings and picks up new seasons and episodes
+
+        Only jobs finished at least older_than seconds ago are requeued; an
+        empty title_ids refreshes every series. Returns the number requeued.
+        """
+        finished_before = time.time() - older_than
+        if not title_ids:
+            return self.queue.requeue(finished_before)
+        requeued = 0
+        for title_id in title_ids:
+            count = self.queue.requeue(finished_before, {'title_id': title_id})
+            if not count and self.queue.enqueue('series', SERIES_EPISODES_URL.format(title_id=title_id),
+                                                {'title_id': title_id}):
+                # Never seeded, so refreshing it is the same as seeding it
+                count = 1
+            logger.info(f"Requeued {count} jobs of {title_id}")
+            requeued += count
+        return requeued
+
+    def run(self, idle_wait: float = 2.0) -> int:
+        """
+        Process jobs until none are pending or leased anywhere. Returns the number handled.
+        """
+        handled = 0
+        while True:
+            job = self.queue.lease(self.worker_id)
+            if job is None:
+                if not self.queue.has_unfinished():
+                    return handled
+                # Other workers still hold leases that may fail and come back
+                time.sleep(idle_wait)
+                continue
+            try:
+                self._handle(job)
+                self.queue.complete(job, self.worker_id)
+            except Exception as e:
+                logger.error(f"{job.kind} job {job.url} failed (attempt {job.attempts}): {e}")
+                self.queue.fail(job, self.worker_id, str(e))
+            handled += 1
+
+    def _handle(self, job: Job) -> None:
+        content = self.fetcher.fetch(job.url)
+        if job.kind == 'series':
+            self._handle_series(job, content)
+        elif job.kind == 'season':
+            self._handle_season(job, content)
+        elif job.kind == 'episode':
+            self._handle_episode(job, content)
+        else:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+
+    def _handle_series(self, job: Job, content: bytes) -> None:
+        title_id = job.payload['title_id']
+        # A series without season tabs still has one season
+        season_count = parse_season_count(content) or 1
+        logger.info(f"{title_id} has {season_count} seasons")
+        for season in range(1, season_count + 1):
+            self.queue.enqueue('season', season_url(title_id, season), {'title_id': title_id, 'season': season})
+
+    def _handle_season(self, job: Job, content: bytes) -> None:
+        title_id = job.payload['title_id']
+        season = job.payload['season']
+        episodes, episode_urls = self.parse_stage.run(parse_season_page, content, season)
+        logger.info(f"Found {len(episodes)} episodes in {title_id} season {season}")
+
+        for episode in episodes:
+            if episode.episode is None:
+                continue
+            url = episode_urls.get(episode.key)
+            # Listing fields are refreshed; credits from earlier crawls are kept
+            self.conn.execute('''
+                INSERT INTO episodes (series, season, episode, title, air_date, rating, votes, description, url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (series, season, episode) DO UPDATE SET
+                    title = excluded.title, air_date = excluded.air_date, rating = excluded.rating,
+                    votes = excluded.votes, description = excluded.description, url = excluded.url
+            ''', (title_id, season, episode.episode, episode.title,
+                  episode.air_date.isoformat() if episode.air_date else episode.air_date_text,
+                  episode.rating, episode.votes, episode.description, url))
+            if url:
+                self.queue.enqueue('episode', episode_page_url(url),
+                                   {'title_id': title_id, 'season': season, 'episode': episode.episode})
+
+    def _handle_episode(self, job: Job, content: bytes) -> None:
+        director, writer = primary_credits(self.parse_stage.run(extract_credits, content))
+        self.conn.execute(
+            'UPDATE episodes SET director = ?, writer = ? WHERE series = ? AND season = ? AND episode = ?',
+            (director, writer, job.payload['title_id'], job.payload['season'], job.payload['episode'])
+        )
+
+    def export(self, title_id: str, path: str) -> int:
+        """
+        Write one series' episodes to a CSV in the dataset layout
+        """
+        self.conn.row_factory = sqlite3.Row
+        rows = self.conn.execute(
+            f'SELECT {", ".join(FIELDNAMES)} FROM episodes WHERE series = ? ORDER BY season, episode', (title_id,)
+        )
+        sink = CsvSink(path)
+        try:
+            for row in rows:
+                # sqlite3.Row has no .get(), which from_dict relies on for optional fields
+                sink.write(Episode.from_dict(dict(row)))
+        except BaseException:
+            sink.discard()
+            raise
+        sink.close()
+        return sink.count
+
+    def close(self) -> None:
+        self.queue.close()
+
+
+def run_worker(db_path: str, requests_per_second: float, max_workers: int, parse_workers: int) -> None:
+    """
+    Run one worker process: max_workers threads sharing a rate-limited fetcher
+    """
+    fetcher = Fetcher(requests_per_second=requests_per_second, max_workers=max_workers, cache=HttpCache())
+    parse_stage = ParseStage(parse_workers)
+    prefix = f'{socket.gethostname()}-{os.getpid()}'
+
+    def work(index):
+        # SQLite connections are per thread, so each thread gets its own crawler
+        crawler = SeriesCrawler(db_path, f'{prefix}-{index}', fetcher, parse_stage)
+        try:
+            handled = crawler.run()
+            logger.info(f"Worker {crawler.worker_id} finished after {handled} jobs")
+        finally:
+            crawler.close()
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(max_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    fetcher.close()
+    parse_stage.close()
+    fetcher.cache.log_stats()
+
+
+def main():
+    """
+    Main function to run the crawler
+    """
+    parser = argparse.ArgumentParser(description="Crawl episode ratings and credits for many IMDB series")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f"queue and results database (default: {DEFAULT_DB_PATH})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help="queue series by IMDB title id")
+    seed_parser.add_argument('title_ids', nargs='+')
+
+    work_parser = subparsers.add_parser('work', help="drain the queue")
+    work_parser.add_argument('--processes', type=int, default=1, help="worker processes on this machine (default: 1)")
+    work_parser.add_argument('--requests-per-second', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                             help="request rate ceiling for this machine, split across its processes "
+                                  f"(default: {DEFAULT_REQUESTS_PER_SECOND})")
+    work_parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                             help=f"fetch threads per process (default: {DEFAULT_MAX_WORKERS})")
+    work_parser.add_argument('--parse-workers', type=int, default=0,
+                             help="parse worker processes per process (default: 0, inline)")
+
+    refresh_parser = subparsers.add_parser('refresh', help="queue the pages of seeded series again")
+    refresh_parser.add_argument('title_ids', nargs='*', help="series to refresh (default: all)")
+    refresh_parser.add_argument('--older-than', type=float, default=0.0, metavar='HOURS',
+                                help="only requeue pages last crawled at least this long ago (default: 0, all)")
+
+    subparsers.add_parser('status', help="show job counts")
+
+    export_parser = subparsers.add_parser('export', help="write one series to CSV")
+    export_parser.add_argument('title_id')
+    export_parser.add_argument('-o', '--output', help="output path (default: <title_id>_episodes.csv)")
+
+    args = parser.parse_args()
+
+    if args.command == 'work':
+        rate = args.requests_per_second / args.processes
+        processes = [multiprocessing.Process(target=run_worker,
+                                             args=(args.db, rate, args.max_workers, args.parse_workers))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    crawler = SeriesCrawler(args.db, 'cli', fetcher=None)
+    if args.command == 'seed':
+        crawler.seed(args.title_ids)
+    elif args.command == 'refresh':
+        print(f"Requeued {crawler.refresh(args.title_ids, args.older_than * 3600)} jobs")
+    elif args.command == 'export':
+        output = args.output or f'{args.title_id}_episodes.csv'
+        print(f"Exported {crawler.export(args.title_id, output)} episodes to {output}")
+    print(f"Queue status: {crawler.queue.counts()}")
+    crawler.close()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
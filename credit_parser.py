@@ -0,0 +1,127 @@
+"""
+Credit extraction for IMDB episode pages
+
+IMDB pages embed their data as a __NEXT_DATA__ JSON blob. Reading credits
+from it takes one byte search and one json.loads, instead of walking the
+ancestors of every /name/ link in a full BeautifulSoup tree. The old DOM
+heuristic is kept as a fallback for pages without the blob.
+"""
+
+import json
+import logging
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+NEXT_DATA_MARKER = b'<script id="__NEXT_DATA__"'
+SCRIPT_END = b'</script>'
+
+
+def extract_credits(content: bytes) -> Dict[str, List[str]]:
+    """
+    Extract credits from an episode page as {category: [names]}
+
+    Categories are IMDB's credit category ids, e.g. 'director', 'writer' and
+    'cast'. Names keep page order and are de-duplicated.
+    """
+    credits = _credits_from_next_data(content)
+    if credits is None:
+        logger.debug("No usable __NEXT_DATA__ blob, falling back to DOM heuristic")
+        credits = _credits_from_dom(content)
+    return credits
+
+
+def primary_credits(credits: Dict[str, List[str]]) -> tuple:
+    """
+    Collapse extracted credits to the (director, writer) strings stored in the dataset
+
+    Multiple people are joined with ', '; a missing category gives None.
+    """
+    director = ', '.join(credits.get('director', [])) or None
+    writer = ', '.join(credits.get('writer', [])) or None
+    return director, writer
+
+
+def _next_data(content: bytes) -> Optional[dict]:
+    start = content.find(NEXT_DATA_MARKER)
+    if start < 0:
+        return None
+    start = content.find(b'>', start) + 1
+    end = content.find(SCRIPT_END, start)
+    if start <= 0 or end < 0:
+        return None
+    try:
+        return json.loads(content[start:end])
+    except ValueError as e:
+        logger.warning(f"Could not decode __NEXT_DATA__: {e}")
+        return None
+
+
+def _add_name(credits: Dict[str, List[str]], category: str, name: Optional[dict]) -> None:
+    text = ((name or {}).get('nameText') or {}).get('text')
+    if text and text not in credits.setdefault(category, []):
+        credits[category].append(text)
+
+
+def _credits_from_next_data(content: bytes) -> Optional[Dict[str, List[str]]]:
+    data = _next_data(content)
+    if data is None:
+        return None
+
+    page_props = data.get('props', {}).get('pageProps', {})
+    main_column = page_props.get('mainColumnData') or {}
+    above_fold = page_props.get('aboveTheFoldData') or {}
+    credits: Dict[str, List[str]] = {}
+
+    # Full director and writer lists
+    for category, key in (('director', 'directors'), ('writer', 'writers')):
+        for group in main_column.get(key) or []:
+            for credit in group.get('credits') or []:
+                _add_name(credits, category, credit.get('name'))
+
+    # Full cast list
+    for edge in (main_column.get('cast') or {}).get('edges') or []:
+        _add_name(credits, 'cast', (edge.get('node') or {}).get('name'))
+
+    # Principal credits cover any other categories shown above the fold
+    for group in above_fold.get('principalCredits') or []:
+        category = (group.get('category') or {}).get('id')
+        if category:
+            for credit in group.get('credits') or []:
+                _add_name(credits, category, credit.get('name'))
+
+    if not credits:
+        return None
+    return credits
+
+
+def _credits_from_dom(content: bytes) -> Dict[str, List[str]]:
+    """
+    Heuristic fallback: label each /name/ link by the nearest ancestor text
+    mentioning Director or Writer. Only finds the first of each.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    credits: Dict[str, List[str]] = {}
+
+    for link in soup.find_all('a', href=True):
+        if 'director' in credits and 'writer' in credits:
+            break
+        if '/name/nm' not in link['href']:
+            continue
+
+        current = link.parent
+        for _ in range(4):  # Check up to 4 levels up
+            if current is None:
+                break
+            context_text = current.get_text()
+            if 'Director' in context_text and 'director' not in credits:
+                credits['director'] = [link.get_text(strip=True)]
+                break
+            elif 'Writer' in context_text and 'writer' not in credits:
+                credits['writer'] = [link.get_text(strip=True)]
+                break
+            current = current.parent
+
+    return credits
@@ -0,0 +1,13 @@
+"""
+Command-line package for the Curb Your Enthusiasm scraper and visualization
+
+    python3 -m curb scrape --with-credits
+    python3 -m curb credits
+    python3 -m curb summary
+    python3 -m curb serve
+    python3 -m curb bench
+
+The subcommands wrap the scripts at the top of the repository, which still
+run on their own. Importing this package stays cheap: requests, bs4 and
+numpy are only imported by the subcommands that use them (see cli.py).
+"""
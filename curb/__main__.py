@@ -0,0 +1,7 @@
+"""
+Entry point for python3 -m curb
+"""
+
+from curb.cli import main
+
+main()
@@ -0,0 +1,58 @@
+"""
+The curb command: one entry point for the scrapers, summary, server and benchmarks
+
+Only the chosen subcommand's module is imported, after the command line
+names it. `curb summary` and `curb serve` therefore start without loading
+requests, bs4 or numpy, and `curb --help` loads none of the subcommands.
+Each module's main(argv, prog) parses the rest of the command line, so
+`curb scrape --help` shows the scraper's own options.
+
+`pip install .` installs this package, the scripts it wraps and a `curb`
+console script (see pyproject.toml). The page, the benchmarks and their
+fixtures stay in the checkout, so `curb build` and `curb bench` run only
+from there.
+"""
+
+import argparse
+import importlib
+import sys
+from typing import List, NamedTuple, Optional
+
+from curb.config import configure_logging
+
+
+class Command(NamedTuple):
+    module: str
+    help: str
+
+
+COMMANDS = {
+    'scrape': Command('scrape_curb_episodes', "scrape episode ratings (and with --with-credits, credits) from IMDB"),
+    'credits': Command('get_episode_credits', "add director and writer credits to curb_episodes.csv"),
+    'summary': Command('curb.summary', "print the per-season rating summary"),
+    'serve': Command('start_server', "serve the visualization and the /api/ endpoints"),
+    'build': Command('build_site', "build the static, precompressed site into dist/"),
+    'bench': Command('benchmarks.run_benchmarks', "run the offline benchmarks against the baseline"),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='curb', description="Curb Your Enthusiasm episode scraper and visualization",
+                                     epilog="Run 'curb COMMAND --help' for the options of a command.")
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+    for name, command in COMMANDS.items():
+        # The command's own parser handles its options, including --help
+        subparsers.add_parser(name, help=command.help, add_help=False)
+    args, rest = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    configure_logging()
+    command = COMMANDS[args.command]
+    try:
+        module = importlib.import_module(command.module)
+    except ModuleNotFoundError as error:
+        # benchmarks/ is not installed with the package
+        if error.name != command.module.split('.')[0]:
+            raise
+        parser.error(f"'curb {args.command}' runs only from a checkout of the repository; "
+                     f"run python3 -m curb {args.command} there")
+    module.main(rest, prog=f'curb {args.command}')
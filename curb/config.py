@@ -0,0 +1,95 @@
+"""
+Shared settings and command-line plumbing for the scrapers
+
+Logging setup, fetch defaults and the fetch-related command-line options
+used to be repeated in every script; they live here now. The module only
+imports the standard library, so the CLI can read it without paying for
+requests or bs4. The stores behind the options are imported when
+open_fetch_stores() builds them.
+"""
+
+import argparse
+import logging
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from http_archive import HttpArchive
+    from http_cache import HttpCache
+    from metrics import RunMetrics
+    from retry import DeadLetters
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 30
+DEFAULT_DEAD_LETTER_PATH = 'curb_failed_pages.json'
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """
+    Log to stderr in the format every script uses
+    """
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
+def add_fetch_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the rate, worker, metrics, failed-pages and --record/--replay options to a parser
+    """
+    parser.add_argument('--requests-per-second', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help=f"per-host request rate ceiling (default: {DEFAULT_REQUESTS_PER_SECOND})")
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"concurrent fetch workers (default: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument('--metrics', metavar='BASENAME',
+                        help="write per-request timings and a run report to BASENAME.json and BASENAME.prom")
+    parser.add_argument('--failed-pages', default=DEFAULT_DEAD_LETTER_PATH,
+                        help=f"where pages that failed after all retries are listed (default: {DEFAULT_DEAD_LETTER_PATH})")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='ARCHIVE',
+                       help="save every response of this run to an HTTP archive file")
+    group.add_argument('--replay', metavar='ARCHIVE',
+                       help="serve every request from an HTTP archive file; no network or rate limiting")
+
+
+class FetchStores(NamedTuple):
+    """
+    The cache, archive, metrics and dead letters of one run, built from add_fetch_arguments() options
+    """
+    cache: Optional['HttpCache']
+    archive: Optional['HttpArchive']
+    metrics: 'RunMetrics'
+    dead_letters: 'DeadLetters'
+
+    def close(self, metrics_basename: Optional[str] = None) -> None:
+        """
+        Save the failed pages, report run metrics, then report on and close the cache and archive
+        """
+        self.dead_letters.save()
+        self.metrics.log_summary()
+        if metrics_basename:
+            self.metrics.write(metrics_basename)
+        for store in (self.cache, self.archive):
+            if store is not None:
+                store.log_stats()
+                store.close()
+
+
+def open_fetch_stores(args: argparse.Namespace) -> FetchStores:
+    """
+    Open the stores selected by add_fetch_arguments() options
+    """
+    from http_archive import RECORD, REPLAY, HttpArchive
+    from http_cache import HttpCache
+    from metrics import RunMetrics
+    from retry import DeadLetters
+
+    archive = None
+    if args.record:
+        archive = HttpArchive(args.record, RECORD)
+    elif args.replay:
+        archive = HttpArchive(args.replay, REPLAY)
+    # A replay must not depend on whatever happens to be in the local cache
+    cache = None if args.replay else HttpCache()
+    return FetchStores(cache, archive, RunMetrics(), DeadLetters(args.failed_pages))
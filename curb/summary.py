@@ -0,0 +1,82 @@
+"""
+Print the rating summary, reading the precomputed summary file when it is current
+
+analytics.py writes <basename>.summary.json whenever the dataset is saved.
+When that file is at least as new as the CSV and in the current format,
+`curb summary` prints it without importing numpy or reading the dataset.
+Otherwise it recomputes the summary with analytics.py, rewrites the file
+and prints that.
+
+    python3 -m curb summary [curb_episodes_with_credits.csv] [--refresh]
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List, Optional
+
+FORMAT_VERSION = 1
+DEFAULT_CSV_PATH = 'curb_episodes_with_credits.csv'
+
+
+def summary_path(csv_path: str) -> str:
+    basename = csv_path[:-4] if csv_path.endswith('.csv') else csv_path
+    return f'{basename}.summary.json'
+
+
+def load_summary(csv_path: str) -> Optional[Dict]:
+    """
+    The summary document for csv_path, or None if it is missing, older than the CSV or in another format
+    """
+    path = summary_path(csv_path)
+    try:
+        if os.stat(path).st_mtime_ns < os.stat(csv_path).st_mtime_ns:
+            return None
+        with open(path, encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get('version') == FORMAT_VERSION else None
+
+
+def print_summary(summary: Dict, title: str = "CURB YOUR ENTHUSIASM EPISODE SCRAPING SUMMARY") -> None:
+    """
+    Print the season breakdown and extremes of a summary document
+    """
+    seasons = summary['seasons']
+    print("\n" + "="*60)
+    print(title)
+    print("="*60)
+    print(f"Total Episodes: {sum(season['episodes'] for season in seasons)}")
+    print(f"Total Seasons: {len(seasons)}")
+    print("\nEpisodes per Season:")
+
+    for season in seasons:
+        avg_rating = f"{season['mean']:.1f}" if season['mean'] is not None else "n/a"
+        print(f"  Season {season['season']}: {season['episodes']} episodes (avg rating: {avg_rating})")
+
+    highest_rated, lowest_rated = summary['highest_rated'], summary['lowest_rated']
+    if highest_rated:
+        print(f"\nHighest Rated Episode: S{highest_rated['season']}E{highest_rated['episode']} - {highest_rated['title']} ({highest_rated['rating']}/10)")
+        print(f"Lowest Rated Episode: S{lowest_rated['season']}E{lowest_rated['episode']} - {lowest_rated['title']} ({lowest_rated['rating']}/10)")
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Print the per-season rating summary of the dataset")
+    parser.add_argument('csv_path', nargs='?', default=DEFAULT_CSV_PATH,
+                        help=f"dataset CSV (default: {DEFAULT_CSV_PATH})")
+    parser.add_argument('--refresh', action='store_true',
+                        help="recompute the summary even if the summary file is current")
+    args = parser.parse_args(argv)
+
+    summary = None if args.refresh else load_summary(args.csv_path)
+    if summary is None:
+        # Only a stale or missing summary pays for numpy and a pass over the dataset
+        from analytics import write_summary
+        from dataset_io import iter_csv
+
+        path = summary_path(args.csv_path)
+        summary = write_summary(iter_csv(args.csv_path), path[:-len('.summary.json')])
+        # An unchanged summary is not rewritten, so mark it current for the next run
+        os.utime(path)
+    print_summary(summary, title="EPISODE RATING SUMMARY")
@@ -0,0 +1,92 @@
+"""
+Reading and writing the episode dataset files
+
+Outputs are rendered in memory and only written when their content hash
+differs from the file on disk, so an unchanged refresh leaves the files
+(and their modification times) untouched.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from episode import FIELDNAMES, Episode
+
+logger = logging.getLogger(__name__)
+
+
+def render_csv(episodes: Iterable[Episode]) -> str:
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDNAMES)
+    writer.writerows(episode.to_csv_values() for episode in episodes)
+    return buffer.getvalue()
+
+
+def render_json(episodes: Iterable[Episode]) -> str:
+    return json.dumps([episode.to_json_dict() for episode in episodes], indent=2, ensure_ascii=False)
+
+
+def iter_csv(path: str) -> Iterator[Episode]:
+    """
+    Stream the episodes of a dataset CSV; columns missing from the file are left empty
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [header.index(name) if name in header else -1 for name in FIELDNAMES]
+        for values in reader:
+            yield Episode.from_csv_values(values, columns)
+
+
+def iter_json(path: str) -> Iterator[Episode]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in json.load(f):
+            yield Episode.from_dict(row)
+
+
+def iter_ndjson(path: str) -> Iterator[Episode]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield Episode.from_dict(json.loads(line))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    if not os.path.exists(path):
+        return ''
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_if_changed(path: str, text: str) -> bool:
+    """
+    Write text to path unless the file already has identical content
+
+    Returns True if the file was written.
+    """
+    if file_hash(path) == content_hash(text):
+        logger.info(f"{path} unchanged, not rewriting")
+        return False
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+def load_csv_episodes(path: str) -> Dict[Tuple[int, Optional[int]], Episode]:
+    """
+    Load a dataset CSV keyed by (season, episode); a missing file gives {}
+    """
+    if not os.path.exists(path):
+        return {}
+    return {episode.key: episode for episode in iter_csv(path)}
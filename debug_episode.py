@@ -3,31 +3,29 @@
 Debug script to examine the HTML structure of an individual episode page
 """
 
-import requests
 from bs4 import BeautifulSoup
 
+from fetcher import Fetcher
+from http_cache import HttpCache
+
 def debug_episode_page():
     # Test with the first episode
     url = "https://www.imdb.com/title/tt0551416/?ref_=ttep_ep_1"
     
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    })
+    fetcher = Fetcher(cache=HttpCache())
     
     try:
-        response = session.get(url)
-        response.raise_for_status()
+        content = fetcher.fetch(url)
+        text = content.decode('utf-8')
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(content, 'html.parser')
         
         # Save the HTML to a file for inspection
         with open('episode_page.html', 'w', encoding='utf-8') as f:
-            f.write(response.text)
+            f.write(text)
         
         print("Episode page saved to episode_page.html")
-        print(f"Status code: {response.status_code}")
-        print(f"Page length: {len(response.text)} characters")
+        print(f"Page length: {len(text)} characters")
         
         # Look for various credit selectors
         print("\n--- Searching for director/writer information ---")
@@ -0,0 +1,203 @@
+"""
+Typed episode record shared by the scrapers, the pipeline and the dataset files
+
+Episode keeps numbers as numbers and the air date as a datetime.date, and
+uses __slots__ so a row costs a fixed handful of pointers instead of a dict.
+IMDB shows only a year or a month ("2000", "Oct 2000") for some unaired
+episodes; such a partial date has no datetime.date, so its text is kept in
+air_date_text instead and written back out unchanged.
+The codecs convert to and from the on-disk layouts:
+
+- CSV rows are strings. The air date keeps IMDB's display form
+  ("Sun, Oct 22, 2000"), which the visualization shows verbatim, and
+  missing values are empty strings.
+- JSON/NDJSON objects keep numbers typed, write the air date as an ISO
+  date ("2000-10-22") or a partial date's text, and missing values as null.
+"""
+
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+FIELDNAMES = ['season', 'episode', 'title', 'air_date', 'rating', 'votes', 'description', 'director', 'writer']
+
+_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+_MONTH_NUMBERS = {name: number for number, name in enumerate(_MONTHS, 1)}
+_WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def parse_air_date(text: Optional[str]) -> Optional[datetime.date]:
+    """
+    Parse IMDB's "Sun, Oct 22, 2000" or an ISO "2000-10-22" into a date
+
+    Returns None for empty or unrecognised text, including partial dates such
+    as "2000"; split_air_date keeps their text.
+    """
+    if not text:
+        return None
+    try:
+        if text[:4].isdigit():
+            return datetime.date.fromisoformat(text)
+        # "Sun, Oct 22, 2000": the weekday is derived from the date, so it is skipped
+        month_day, year = text.split(', ')[-2:]
+        month, day = month_day.split(' ')
+        return datetime.date(int(year), _MONTH_NUMBERS[month], int(day))
+    except (KeyError, ValueError):
+        return None
+
+
+def split_air_date(value) -> Tuple[Optional[datetime.date], Optional[str]]:
+    """
+    Turn a date, its text or None into (air_date, air_date_text)
+
+    air_date_text is only set for text that is not a full date.
+    """
+    if value is None or isinstance(value, datetime.date):
+        return value, None
+    air_date = parse_air_date(value)
+    return air_date, None if air_date or not value else value
+
+
+def format_air_date(value: Optional[datetime.date]) -> str:
+    """
+    Format a date the way IMDB displays it, e.g. "Sun, Oct 22, 2000"
+    """
+    if value is None:
+        return ''
+    return f'{_WEEKDAYS[value.weekday()]}, {_MONTHS[value.month - 1]} {value.day}, {value.year}'
+
+
+def _optional(parse, value):
+    # CSV gives '' and JSON gives null for a missing value
+    if value is None or value == '':
+        return None
+    return parse(value)
+
+
+class Episode:
+    """
+    One episode row with typed fields
+
+    Episodes compare equal field by field. They are mutable, so they are
+    deliberately unhashable (__hash__ is None); use key for sets and dicts.
+    """
+
+    __slots__ = tuple(FIELDNAMES) + ('air_date_text',)
+    __hash__ = None
+
+    def __init__(self, season: int, episode: Optional[int], title: Optional[str] = None,
+                 air_date: Optional[datetime.date] = None, rating: Optional[float] = None,
+                 votes: Optional[int] = None, description: Optional[str] = None,
+                 director: Optional[str] = None, writer: Optional[str] = None,
+                 air_date_text: Optional[str] = None):
+        self.season = season
+        self.episode = episode
+        self.title = title
+        self.air_date = air_date
+        self.rating = rating
+        self.votes = votes
+        self.description = description
+        self.director = director
+        self.writer = writer
+        self.air_date_text = air_date_text
+
+    @property
+    def key(self) -> Tuple[int, Optional[int]]:
+        return self.season, self.episode
+
+    @property
+    def has_credits(self) -> bool:
+        return bool(self.director and self.writer)
+
+    def replace(self, **changes) -> 'Episode':
+        """
+        Return a copy with some fields changed
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Episode(**fields)
+
+    @classmethod
+    def from_dict(cls, row: Dict) -> 'Episode':
+        """
+        Build an Episode from a CSV, JSON or database row, converting field types
+
+        Missing keys and empty values become None.
+        """
+        air_date, air_date_text = split_air_date(row.get('air_date'))
+        return cls(
+            int(row['season']),
+            _optional(int, row.get('episode')),
+            row.get('title') or None,
+            air_date,
+            _optional(float, row.get('rating')),
+            _optional(int, row.get('votes')),
+            row.get('description') or None,
+            row.get('director') or None,
+            row.get('writer') or None,
+            air_date_text,
+        )
+
+    @classmethod
+    def from_csv_values(cls, values: Sequence[str], columns: Sequence[int]) -> 'Episode':
+        """
+        Build an Episode from a csv.reader row
+
+        columns gives, for each name in FIELDNAMES, its index in the row or -1
+        if the file has no such column.
+        """
+        season, episode, title, air_date, rating, votes, description, director, writer = (
+            values[index] if index >= 0 else '' for index in columns
+        )
+        air_date, air_date_text = split_air_date(air_date)
+        return cls(
+            int(season),
+            int(episode) if episode else None,
+            title or None,
+            air_date,
+            float(rating) if rating else None,
+            int(votes) if votes else None,
+            description or None,
+            director or None,
+            writer or None,
+            air_date_text,
+        )
+
+    def to_csv_values(self) -> List[str]:
+        """
+        Field values as CSV strings, in FIELDNAMES order
+        """
+        return [
+            str(self.season),
+            '' if self.episode is None else str(self.episode),
+            self.title or '',
+            format_air_date(self.air_date) or self.air_date_text or '',
+            '' if self.rating is None else str(self.rating),
+            '' if self.votes is None else str(self.votes),
+            self.description or '',
+            self.director or '',
+            self.writer or '',
+        ]
+
+    def to_json_dict(self) -> Dict:
+        """
+        JSON-ready dict with typed numbers and an ISO air date
+        """
+        return {
+            'season': self.season,
+            'episode': self.episode,
+            'title': self.title,
+            'air_date': self.air_date.isoformat() if self.air_date else self.air_date_text,
+            'rating': self.rating,
+            'votes': self.votes,
+            'description': self.description,
+            'director': self.director,
+            'writer': self.writer,
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Episode):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f'Episode(S{self.season}E{self.episode} {self.title!r})'
@@ -0,0 +1,288 @@
+"""
+In-memory query API over the episode dataset, served by start_server.py
+
+    GET /api/episodes?season=1,2&director=Larry%20Charles&min_rating=8&sort=-rating&limit=20
+    GET /api/episodes?cursor=<next_cursor from the previous page>
+    GET /api/seasons
+    GET /api/search?q=larry%20dav&limit=20
+
+The dataset is indexed once: episode ids per season and per credited
+person, and the id order for every sort key. Indexes are rebuilt only
+when the data file's mtime or size changes. Filters are resolved by
+intersecting index entries, and a page is cut by walking the precomputed
+order for the sort key, so paging never re-sorts. Cursors are opaque and
+tied to the index version. A cursor from before a rebuild is rejected
+instead of silently skipping or repeating rows.
+"""
+
+import base64
+import bisect
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dataset_io import iter_csv
+from episode import Episode
+from search_index import SearchIndex
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# sort key -> function giving a comparable value, or None for a missing one
+SORT_KEYS = {
+    'season': lambda episode: (episode.season, episode.episode or 0),
+    'rating': lambda episode: episode.rating,
+    'votes': lambda episode: episode.votes,
+    'air_date': lambda episode: episode.air_date,
+    'title': lambda episode: episode.title.casefold() if episode.title else None,
+}
+DEFAULT_SORT = 'season'
+
+
+class QueryError(ValueError):
+    """
+    A malformed query; reported to the client as HTTP 400
+    """
+
+
+def credited_people(value: Optional[str]) -> List[str]:
+    """
+    Split a "Name, Other Name" credit into names
+    """
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+class EpisodeIndex:
+    """
+    Immutable indexes over one load of the dataset
+    """
+
+    def __init__(self, episodes: List[Episode], version: str):
+        self.episodes = episodes
+        self.version = version
+        self.by_season: Dict[int, List[int]] = {}
+        self.by_director: Dict[str, List[int]] = {}
+        self.by_writer: Dict[str, List[int]] = {}
+        for episode_id, episode in enumerate(episodes):
+            self.by_season.setdefault(episode.season, []).append(episode_id)
+            for name in credited_people(episode.director):
+                self.by_director.setdefault(name.casefold(), []).append(episode_id)
+            for name in credited_people(episode.writer):
+                self.by_writer.setdefault(name.casefold(), []).append(episode_id)
+
+        # Every sort order, ascending ('rating') and descending ('-rating'), computed once.
+        # Episodes missing the sort value come last either way.
+        self.orders: Dict[str, List[int]] = {}
+        for key, sort_key in SORT_KEYS.items():
+            values = [sort_key(episode) for episode in episodes]
+            present = sorted((episode_id for episode_id, value in enumerate(values) if value is not None),
+                             key=lambda episode_id: values[episode_id])
+            missing = [episode_id for episode_id, value in enumerate(values) if value is None]
+            self.orders[key] = present + missing
+            self.orders['-' + key] = present[::-1] + missing
+            if key == 'rating':
+                # Ratings in ascending order, for bisecting a rating range
+                self.rating_ids = present
+                self.rating_values = [values[episode_id] for episode_id in present]
+        self.seasons = self._season_aggregates()
+        self.search_index = SearchIndex.build(episodes)
+
+    def _season_aggregates(self) -> List[Dict]:
+        seasons = []
+        for season in sorted(self.by_season):
+            episodes = [self.episodes[episode_id] for episode_id in self.by_season[season]]
+            ratings = [episode.rating for episode in episodes if episode.rating is not None]
+            air_dates = [episode.air_date for episode in episodes if episode.air_date]
+            seasons.append({
+                'season': season,
+                'episodes': len(episodes),
+                'avg_rating': round(sum(ratings) / len(ratings), 2) if ratings else None,
+                'min_rating': min(ratings) if ratings else None,
+                'max_rating': max(ratings) if ratings else None,
+                'total_votes': sum(episode.votes or 0 for episode in episodes),
+                'first_air_date': min(air_dates).isoformat() if air_dates else None,
+                'last_air_date': max(air_dates).isoformat() if air_dates else None,
+            })
+        return seasons
+
+    def rating_range(self, low: Optional[float], high: Optional[float]) -> List[int]:
+        start = 0 if low is None else bisect.bisect_left(self.rating_values, low)
+        end = len(self.rating_values) if high is None else bisect.bisect_right(self.rating_values, high)
+        return self.rating_ids[start:end]
+
+    def candidates(self, seasons: Optional[List[int]], director: Optional[str], writer: Optional[str],
+                   min_rating: Optional[float], max_rating: Optional[float]) -> Optional[Set[int]]:
+        """
+        Ids matching every filter, or None when no filter is set
+        """
+        matches: Optional[Set[int]] = None
+
+        def narrow(ids: Iterable[int]) -> None:
+            nonlocal matches
+            matches = set(ids) if matches is None else matches.intersection(ids)
+
+        if seasons is not None:
+            narrow(episode_id for season in seasons for episode_id in self.by_season.get(season, ()))
+        if director is not None:
+            narrow(self.by_director.get(director.casefold(), ()))
+        if writer is not None:
+            narrow(self.by_writer.get(writer.casefold(), ()))
+        if min_rating is not None or max_rating is not None:
+            narrow(self.rating_range(min_rating, max_rating))
+        return matches
+
+
+def _encode_cursor(version: str, query: Dict, position: int) -> str:
+    raw = json.dumps([version, query, position], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, Dict, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        version, query, position = json.loads(raw)
+        return str(version), dict(query), int(position)
+    except (ValueError, TypeError):
+        raise QueryError("invalid cursor")
+
+
+def _single(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else None
+
+
+def _number(params: Dict[str, List[str]], name: str, convert):
+    value = _single(params, name)
+    if value is None or value == '':
+        return None
+    try:
+        return convert(value)
+    except ValueError:
+        raise QueryError(f"{name} must be a number")
+
+
+class EpisodeApi:
+    """
+    Answers the /api/ endpoints from an EpisodeIndex over a dataset CSV
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Optional[EpisodeIndex] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self.lock = threading.Lock()
+
+    def index(self) -> EpisodeIndex:
+        """
+        Current index, rebuilt if the data file changed since it was built
+        """
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if self._index is None or stamp != self._stamp:
+                self._index = EpisodeIndex(list(iter_csv(self.path)), f'{stamp[0]:x}-{stamp[1]:x}')
+                self._stamp = stamp
+            return self._index
+
+    def handle(self, route: str, params: Dict[str, List[str]]) -> Tuple[int, Dict]:
+        """
+        Answer one API request; returns (HTTP status, JSON payload)
+        """
+        try:
+            if route == '/api/episodes':
+                return 200, self.episodes(params)
+            if route == '/api/seasons':
+                return 200, {'seasons': self.index().seasons}
+            if route == '/api/search':
+                return 200, self.search(params)
+        except QueryError as e:
+            return 400, {'error': str(e)}
+        except FileNotFoundError:
+            return 503, {'error': f"{os.path.basename(self.path)} not found"}
+        return 404, {'error': f"unknown endpoint {route}"}
+
+    @staticmethod
+    def _parse_query(params: Dict[str, List[str]]) -> Dict:
+        """
+        Normalise the filter and sort parameters of a first-page request
+        """
+        sort = _single(params, 'sort') or DEFAULT_SORT
+        if sort.lstrip('-') not in SORT_KEYS:
+            raise QueryError(f"sort must be one of {', '.join(SORT_KEYS)} (prefix '-' for descending)")
+        season_values = ','.join(params.get('season', []))
+        try:
+            seasons = [int(value) for value in season_values.split(',') if value] if season_values else None
+        except ValueError:
+            raise QueryError("season must be a comma-separated list of numbers")
+        return {
+            'sort': sort,
+            'season': seasons,
+            'director': _single(params, 'director') or None,
+            'writer': _single(params, 'writer') or None,
+            'min_rating': _number(params, 'min_rating', float),
+            'max_rating': _number(params, 'max_rating', float),
+        }
+
+    def episodes(self, params: Dict[str, List[str]]) -> Dict:
+        """
+        One page of episodes. A cursor carries the filters and sort of the first
+        page, so follow-up requests only need cursor (and optionally limit).
+        """
+        index = self.index()
+
+        cursor = _single(params, 'cursor')
+        if cursor:
+            version, query, position = _decode_cursor(cursor)
+            if version != index.version:
+                raise QueryError("cursor is from an older version of the data; restart from the first page")
+            start = position + 1
+        else:
+            query = self._parse_query(params)
+            start = 0
+
+        limit = _number(params, 'limit', int) or DEFAULT_LIMIT
+        if not 1 <= limit <= MAX_LIMIT:
+            raise QueryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+        try:
+            order = index.orders[query['sort']]
+            matches = index.candidates(query['season'], query['director'], query['writer'],
+                                       query['min_rating'], query['max_rating'])
+        except (KeyError, TypeError, AttributeError):
+            raise QueryError("invalid cursor")
+
+        items = []
+        position = start
+        while position < len(order) and len(items) < limit:
+            episode_id = order[position]
+            if matches is None or episode_id in matches:
+                items.append(index.episodes[episode_id].to_json_dict())
+            position += 1
+
+        # Skip ahead so the cursor is only handed out when another match exists
+        while position < len(order) and matches is not None:
+            if order[position] in matches:
+                break
+            position += 1
+        next_cursor = _encode_cursor(index.version, query, position - 1) if position < len(order) else None
+
+        return {
+            'items': items,
+            'total': len(index.episodes) if matches is None else len(matches),
+            'next_cursor': next_cursor,
+        }
+
+    def search(self, params: Dict[str, List[str]]) -> Dict:
+        """
+        Episodes matching every word of q (as a prefix), title matches first
+        """
+        index = self.index()
+        limit = _number(params, 'limit', int) or DEFAULT_LIMIT
+        if not 1 <= limit <= MAX_LIMIT:
+            raise QueryError(f"limit must be between 1 and {MAX_LIMIT}")
+        doc_ids = index.search_index.search(_single(params, 'q') or '')
+        return {
+            'items': [index.episodes[doc_id].to_json_dict() for doc_id in doc_ids[:limit]],
+            'total': len(doc_ids),
+        }
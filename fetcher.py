@@ -0,0 +1,253 @@
+"""
+Shared fetch layer for the IMDB scrapers
+
+Wraps a tuned requests.Session with a per-host token-bucket rate limiter and
+a bounded worker pool, so pages can be fetched concurrently while staying
+under a requests-per-second ceiling instead of sleeping between requests.
+Transient failures are retried with backoff behind a per-host circuit
+breaker (see retry.py).
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from curb.config import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, DEFAULT_TIMEOUT, USER_AGENT
+from http_archive import HttpArchive
+from http_cache import HttpCache
+from metrics import ARCHIVE, CACHE, NETWORK, REVALIDATED, RunMetrics
+from retry import CircuitBreaker, RetryPolicy, is_retryable, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+IMDB_BASE_URL = 'https://www.imdb.com'
+
+
+def absolute_url(url: str) -> str:
+    """
+    Turn a site-relative IMDB link into an absolute URL
+    """
+    if url.startswith('/'):
+        return IMDB_BASE_URL + url
+    return url
+
+
+def create_session(pool_connections: int = 10, pool_maxsize: int = 10,
+                   keep_alive: bool = True) -> requests.Session:
+    """
+    Create a requests.Session with the scraper headers and a sized connection pool
+    """
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _retry_count(response: requests.Response) -> int:
+    """
+    Number of retries urllib3 made before this response, if it kept a history
+    """
+    retries = getattr(response.raw, 'retries', None)
+    return len(getattr(retries, 'history', None) or ())
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` acquisitions per second on average
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, blocking until it is available. Returns the seconds waited.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now (possibly going negative) so waiters queue up fairly
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class Fetcher:
+    """
+    Rate-limited, concurrent page fetcher shared by the scrape and credits passes
+    """
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 pool_connections: int = 10, pool_maxsize: Optional[int] = None,
+                 keep_alive: bool = True, timeout: float = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None, cache: Optional[HttpCache] = None,
+                 archive: Optional[HttpArchive] = None, metrics: Optional[RunMetrics] = None,
+                 retry_policy: RetryPolicy = RetryPolicy()):
+        self.requests_per_second = requests_per_second
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        self.metrics = metrics
+        self.retry_policy = retry_policy
+        # Every worker may hold a connection, so never size the pool below the worker count
+        self.session = session or create_session(pool_connections, pool_maxsize or max(max_workers, 10), keep_alive)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+        self._limiters: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._limiters_lock = threading.Lock()
+
+    def _limiter(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._limiters_lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = TokenBucket(self.requests_per_second)
+            return limiter
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._limiters_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, self.retry_policy.breaker_threshold,
+                                                                self.retry_policy.breaker_cooldown)
+            return breaker
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Fetch a URL under the per-host rate limit and return the response body
+
+        Fresh cache entries are returned without touching the network; stale
+        ones are revalidated with a conditional GET. A replaying archive
+        answers every request itself, without rate limiting or retries; a
+        recording one keeps a copy of every response. With metrics set, every
+        attempt is recorded there, including failed ones.
+
+        Transient failures are retried per the retry policy, behind a per-host
+        circuit breaker. Raises requests.RequestException on network errors
+        and HTTP error statuses that outlast the retries, and CircuitOpenError
+        while the host's breaker is open.
+        """
+        url = absolute_url(url)
+        if self.archive is not None and self.archive.replaying:
+            return self._fetch_once(url, 0)
+
+        breaker = self._breaker(url)
+        attempt = 1
+        while True:
+            breaker.before_request()
+            try:
+                # Each sample counts only its own retry; the report sums them
+                body = self._fetch_once(url, 1 if attempt > 1 else 0)
+            except requests.RequestException as e:
+                if not is_retryable(e):
+                    # The host answered (e.g. with a 404), so it is up; this also settles a trial request
+                    breaker.record_success()
+                    raise
+                breaker.record_failure(url)
+                delay = self.retry_policy.delay(attempt, retry_after_seconds(e))
+                if attempt >= self.retry_policy.max_attempts or delay is None:
+                    raise
+                logger.warning(f"Attempt {attempt} for {url} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success()
+            return body
+
+    def _fetch_once(self, url: str, retries: int) -> bytes:
+        """
+        One attempt at fetch(); retries is 1 if this attempt is itself a retry, for the metrics
+        """
+        start = time.perf_counter()
+        source, status, waited, headers_seconds, body = NETWORK, 0, 0.0, 0.0, b''
+        try:
+            if self.archive is not None and self.archive.replaying:
+                source = ARCHIVE
+                body = self.archive.replay(url)
+                status = 200
+                return body
+
+            entry = self.cache.get(url) if self.cache is not None else None
+            if entry is not None and entry.is_fresh():
+                self.cache.record('hit')
+                source, status, body = CACHE, 200, entry.body
+                return self._recorded(url, 200, body)
+
+            waited = self._limiter(url).acquire()
+            headers = entry.conditional_headers() if entry is not None else {}
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            status, body = response.status_code, response.content
+            headers_seconds = response.elapsed.total_seconds()
+            retries += _retry_count(response)
+            if entry is not None and response.status_code == 304:
+                self.cache.refresh(url, response.headers)
+                self.cache.record('revalidated')
+                source, status, body = REVALIDATED, 200, entry.body
+                return self._recorded(url, 200, body)
+            if self.archive is not None and response.status_code >= 400:
+                self.archive.record(url, response.status_code, response.content, response.headers.get('Content-Type'))
+            response.raise_for_status()
+
+            if self.cache is not None:
+                self.cache.put(url, response.content, response.headers)
+                self.cache.record('miss')
+            return self._recorded(url, response.status_code, response.content, response.headers.get('Content-Type'))
+        except requests.RequestException as e:
+            if e.response is not None:
+                status = e.response.status_code
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_fetch(url, source, status, time.perf_counter() - start, waited,
+                                          headers_seconds, len(body), retries)
+
+    def _recorded(self, url: str, status: int, body: bytes, content_type: Optional[str] = None) -> bytes:
+        if self.archive is not None:
+            self.archive.record(url, status, body, content_type)
+        return body
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Run fn on the worker pool
+        """
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Apply fn to every item on the worker pool, yielding results in input order
+        """
+        return self.executor.map(fn, items)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
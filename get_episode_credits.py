@@ -4,185 +4,207 @@ Script to extract director and writer information from IMDB episode pages
 and update the existing CSV file with this information.
 """
 
-import requests
-from bs4 import BeautifulSoup
-import csv
-import json
-import time
+import argparse
 import logging
-import re
+import sys
+from itertools import islice
+
+import requests
+
+from analytics import write_summary
+from checkpoint import CheckpointJournal
+from columnar import write_columnar
+from credit_parser import extract_credits, primary_credits
+from curb.config import (DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, add_fetch_arguments, configure_logging,
+                         open_fetch_stores)
+from dataset_io import iter_csv
+from fetcher import Fetcher, absolute_url
+from parse_stage import DEFAULT_PARSE_WORKERS, SERIAL, ParseStage
+from retry import DeadLetters
+from search_index import write_search_index
+from season_parser import CURB_TITLE_ID, parse_season_page, season_url
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_episode_credits(episode_url, session):
+JOURNAL_PATH = 'curb_episodes_with_credits.journal.ndjson'
+
+def get_episode_credits(episode_url, fetcher, parse_stage=SERIAL):
     """
     Get director and writer information from an episode page
+    
+    Multiple directors or writers are joined with ', '. Raises
+    requests.RequestException if the page cannot be fetched.
     """
     if not episode_url:
         return None, None
         
     # Construct full URL if relative
-    if episode_url.startswith('/'):
-        episode_url = 'https://www.imdb.com' + episode_url
-        
-    try:
-        logger.info(f"Fetching credits from: {episode_url}")
-        response = session.get(episode_url)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find director and writer information
-        director = None
-        writer = None
-        
-        # Look for all name links
-        all_links = soup.find_all('a')
-        
-        # Look for director and writer
-        director_found = False
-        writer_found = False
+    episode_url = absolute_url(episode_url)
         
-        for link in all_links:
-            if director_found and writer_found:
-                break
-                
-            href_attr = link.get('href')
-            if href_attr and '/name/nm' in str(href_attr):
-                # Check the surrounding context for director/writer indicators
-                parent_element = link.parent
-                if parent_element:
-                    # Walk up the element tree to find context
-                    current = parent_element
-                    for _ in range(4):  # Check up to 4 levels up
-                        if current:
-                            context_text = current.get_text()
-                            
-                            if 'Director' in context_text and not director_found:
-                                director = link.get_text(strip=True)
-                                director_found = True
-                                logger.info(f"Found director: {director}")
-                                break
-                            elif 'Writer' in context_text and not writer_found:
-                                writer = link.get_text(strip=True)
-                                writer_found = True
-                                logger.info(f"Found writer: {writer}")
-                                break
-                            
-                            current = current.parent if hasattr(current, 'parent') else None
-        
-        # Rate limit to be respectful
-        time.sleep(1)
-        
-        return director, writer
-        
-    except Exception as e:
-        logger.error(f"Error fetching credits from {episode_url}: {e}")
-        return None, None
+    logger.info(f"Fetching credits from: {episode_url}")
+    content = fetcher.fetch(episode_url)
+    
+    director, writer = primary_credits(parse_stage.run(extract_credits, content))
+    logger.info(f"Found director: {director}, writer: {writer}")
+    
+    return director, writer
 
-def get_episode_url_from_title(title, season, episode, session):
+def build_season_index(season, fetcher, parse_stage=SERIAL, title_id=CURB_TITLE_ID):
     """
-    Get the episode URL by searching through the season page
+    Fetch a season page once and index its episodes by (season, episode)
+    
+    Returns a dict mapping (season, episode) to {'url': ..., 'title': ...}.
+    Raises requests.RequestException if the season page cannot be fetched.
     """
-    season_url = f"https://www.imdb.com/title/tt0264235/episodes/?season={season}&ref_=ttep"
+    url = season_url(title_id, season)
+    index = {}
     
-    try:
-        response = session.get(season_url)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+    logger.info(f"Indexing season {season}: {url}")
+    content = fetcher.fetch(url)
+    
+    episodes, episode_urls = parse_stage.run(parse_season_page, content, season)
+    for episode in episodes:
+        if episode.key in episode_urls:
+            index[episode.key] = {
+                'url': episode_urls[episode.key],
+                'title': episode.title or ''
+            }
+        
+    logger.info(f"Indexed {len(index)} episodes in season {season}")
+    return index
+
+def get_episode_url_from_title(title, season, episode, fetcher, season_index=None, title_id=CURB_TITLE_ID):
+    """
+    Get the episode URL from a season index, building the index if not supplied
+    
+    Looks up (season, episode) directly and only falls back to a fuzzy title
+    match across the season when the episode number is not in the index and
+    the episode has a title.
+    """
+    if season_index is None:
+        season_index = build_season_index(season, fetcher, title_id=title_id)
         
-        # Find all episode containers
-        episode_containers = soup.find_all('article', class_='episode-item-wrapper')
+    entry = season_index.get((season, episode))
+    if entry:
+        return entry['url']
         
-        for container in episode_containers:
-            # Extract episode title and URL
-            title_elem = container.find('a', class_='ipc-title-link-wrapper')
-            if title_elem:
-                title_text = title_elem.get_text(strip=True)
-                episode_url = title_elem.get('href')
-                
-                # Parse episode number from title
-                match = re.search(r'S\d+\.E(\d+)\s*[∙·]\s*(.+)', title_text)
-                if match:
-                    ep_num = int(match.group(1))
-                    ep_title = match.group(2).strip()
-                    
-                    if ep_num == episode and title.lower() in ep_title.lower():
-                        return episode_url
-                        
-    except Exception as e:
-        logger.error(f"Error finding episode URL for S{season}E{episode}: {e}")
+    # Fall back to a fuzzy title match within the season; an empty title would match every entry
+    if not title:
+        return None
+    for (ep_season, ep_num), entry in season_index.items():
+        if ep_season == season and title.lower() in entry['title'].lower():
+            logger.info(f"Matched S{season}E{episode} by title to S{ep_season}E{ep_num}")
+            return entry['url']
         
     return None
 
-def update_csv_with_credits():
+def update_csv_with_credits(requests_per_second=DEFAULT_REQUESTS_PER_SECOND, max_workers=DEFAULT_MAX_WORKERS, cache=None,
+                            journal_path=JOURNAL_PATH, parse_workers=DEFAULT_PARSE_WORKERS, archive=None,
+                            metrics=None, dead_letters=None):
     """
     Update the existing CSV file with director and writer information
-    """
-    # Setup session
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    })
     
+    Season indexes and episode pages are fetched concurrently on a shared
+    Fetcher, whose per-host rate limit replaces the old per-page sleeps.
+    Every finished row is checkpointed to an NDJSON journal, so a killed run
+    resumes where it stopped; the outputs are built from the journal.
+    
+    A page that still fails after the fetcher's retries is recorded in
+    dead_letters and its rows are left out of the journal. The outputs are
+    then not rewritten and the journal is kept, so the next run fetches only
+    the failed pages.
+    """
+    dead_letters = dead_letters if dead_letters is not None else DeadLetters(None)
     # Read existing CSV
     episodes = []
     try:
-        with open('curb_episodes.csv', 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            episodes = list(reader)
+        episodes = list(iter_csv('curb_episodes.csv'))
     except FileNotFoundError:
         logger.error("curb_episodes.csv not found. Please run the main scraper first.")
         return
     
     logger.info(f"Found {len(episodes)} episodes to update")
     
-    # Update each episode with director and writer info
-    for i, episode in enumerate(episodes):
-        season = int(episode['season'])
-        ep_num = int(episode['episode'])
-        title = episode['title']
-        
-        logger.info(f"Processing S{season}E{ep_num}: {title} ({i+1}/{len(episodes)})")
-        
-        # Get episode URL
-        episode_url = get_episode_url_from_title(title, season, ep_num, session)
-        
-        if episode_url:
-            # Get credits
-            director, writer = get_episode_credits(episode_url, session)
-            
-            # Update episode data
-            episode['director'] = director or ''
-            episode['writer'] = writer or ''
-        else:
-            logger.warning(f"Could not find URL for S{season}E{ep_num}: {title}")
-            episode['director'] = ''
-            episode['writer'] = ''
+    # Skip episodes finished by an earlier, interrupted run
+    journal = CheckpointJournal(journal_path)
+    completed = journal.completed_keys()
+    pending = [episode for episode in episodes if episode.key not in completed]
+    if completed:
+        logger.info(f"Resuming from {journal_path}: {len(completed)} done, {len(pending)} remaining")
+    
+    fetcher = Fetcher(requests_per_second=requests_per_second, max_workers=max_workers, cache=cache, archive=archive,
+                      metrics=metrics)
+    parse_stage = ParseStage(parse_workers, metrics)
+    
+    # One index per season, all seasons fetched up front in parallel
+    seasons = sorted({episode.season for episode in pending})
+    def index_season(season):
+        try:
+            return build_season_index(season, fetcher, parse_stage)
+        except requests.RequestException as e:
+            dead_letters.add(season_url(CURB_TITLE_ID, season), 'season', e, season=season)
+            return None
+    
+    season_indexes = dict(zip(seasons, fetcher.map(index_season, seasons)))
+    
+    def fetch_credits(episode):
+        """
+        (director, writer), or None if a page failed for good
+        """
+        season, ep_num = episode.key
+        if season_indexes[season] is None:
+            return None
+        episode_url = get_episode_url_from_title(episode.title or '', season, ep_num, fetcher, season_indexes[season])
+        if not episode_url:
+            logger.warning(f"Could not find URL for S{season}E{ep_num}: {episode.title}")
+            return None, None
+        try:
+            return get_episode_credits(episode_url, fetcher, parse_stage)
+        except requests.RequestException as e:
+            dead_letters.add(absolute_url(episode_url), 'credits', e, season=season, episode=ep_num)
+            return None
+    
+    # Update each episode with director and writer info, journalling in input order
+    done = len(completed)
+    failed = 0
+    for episode, credits in zip(pending, fetcher.map(fetch_credits, pending)):
+        if credits is None:
+            # Not journalled, so the next run picks it up again
+            failed += 1
+            continue
+        director, writer = credits
+        done += 1
+        logger.info(f"Processed S{episode.season}E{episode.episode}: {episode.title} ({done}/{len(episodes)})")
+        
+        # Update episode data
+        episode.director = director
+        episode.writer = writer
+        journal.append(episode)
         
         # Progress update every 10 episodes
-        if (i + 1) % 10 == 0:
-            logger.info(f"Processed {i + 1}/{len(episodes)} episodes")
+        if done % 10 == 0:
+            logger.info(f"Processed {done}/{len(episodes)} episodes")
     
-    # Write updated CSV
-    fieldnames = ['season', 'episode', 'title', 'air_date', 'rating', 'votes', 'description', 'director', 'writer']
+    fetcher.close()
+    parse_stage.close()
+    journal.close()
     
-    with open('curb_episodes_with_credits.csv', 'w', newline='', encoding='utf-8') as csvfile:
-        writer_csv = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer_csv.writeheader()
-        
-        for episode in episodes:
-            writer_csv.writerow(episode)
+    if failed:
+        logger.error(f"{failed} episodes failed; keeping the existing outputs and the journal of "
+                     f"{done} finished episodes, so rerunning fetches only the failed pages")
+        return
     
-    logger.info("Updated CSV saved as 'curb_episodes_with_credits.csv'")
+    # Rows fetched on a retry run were journalled out of input order
+    position = {episode.key: index for index, episode in enumerate(episodes)}
+    journal.sort(key=lambda episode: position.get(episode.key, len(position)))
     
-    # Also save as JSON
-    with open('curb_episodes_with_credits.json', 'w', encoding='utf-8') as jsonfile:
-        json.dump(episodes, jsonfile, indent=2, ensure_ascii=False)
+    # Write updated CSV and JSON in one pass over the journal
+    journal.write_outputs('curb_episodes_with_credits.csv', 'curb_episodes_with_credits.json')
+    write_columnar(journal.iter_episodes(), 'curb_episodes_with_credits')
+    write_search_index(journal.iter_episodes(), 'curb_episodes_with_credits')
+    write_summary(journal.iter_episodes(), 'curb_episodes_with_credits')
     
+    logger.info("Updated CSV saved as 'curb_episodes_with_credits.csv'")
     logger.info("Updated JSON saved as 'curb_episodes_with_credits.json'")
     
     # Print sample results
@@ -190,12 +212,37 @@ def update_csv_with_credits():
     print("SAMPLE RESULTS WITH CREDITS")
     print("="*60)
     
-    for episode in episodes[:5]:  # Show first 5 episodes
-        print(f"S{episode['season']}E{episode['episode']}: {episode['title']}")
-        print(f"  Director: {episode['director'] or 'Not found'}")
-        print(f"  Writer: {episode['writer'] or 'Not found'}")
-        print(f"  Rating: {episode['rating']}/10")
+    for episode in islice(journal.iter_episodes(), 5):  # Show first 5 episodes
+        print(f"S{episode.season}E{episode.episode}: {episode.title}")
+        print(f"  Director: {episode.director or 'Not found'}")
+        print(f"  Writer: {episode.writer or 'Not found'}")
+        print(f"  Rating: {episode.rating}/10")
         print()
+    
+    # The run is complete, so the next one starts fresh
+    journal.remove()
+
+def main(argv=None, prog=None):
+    """
+    Main function to add credits to curb_episodes.csv
+    """
+    parser = argparse.ArgumentParser(prog=prog, description="Add director and writer credits to curb_episodes.csv")
+    parser.add_argument('--parse-workers', type=int, default=DEFAULT_PARSE_WORKERS,
+                        help="worker processes for HTML parsing; 0 parses inline, -1 uses every core "
+                             f"(default: {DEFAULT_PARSE_WORKERS})")
+    add_fetch_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    stores = open_fetch_stores(args)
+    update_csv_with_credits(args.requests_per_second, args.max_workers, cache=stores.cache,
+                            parse_workers=args.parse_workers, archive=stores.archive, metrics=stores.metrics,
+                            dead_letters=stores.dead_letters)
+    stores.close(args.metrics)
+    if stores.dead_letters:
+        print(f"\n{len(stores.dead_letters)} page(s) failed after all retries (see {args.failed_pages}). "
+              f"Rerun to fetch only the failed pages.")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    update_csv_with_credits() 
\ No newline at end of file
+    configure_logging()
+    main()
@@ -0,0 +1,119 @@
+"""
+Record/replay HTTP archive for offline, deterministic scraper runs
+
+In record mode every response the Fetcher hands back, whether from the
+network or the HTTP cache, is stored zlib-compressed in a SQLite file keyed
+by URL, together with its status code and content type. In replay mode the
+Fetcher serves pages from the archive only: no network, no cache and no rate
+limiting. A URL missing from the archive fails like a network error, so a
+replayed run follows exactly the code paths of the recorded one.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class ArchiveMiss(requests.RequestException):
+    """
+    Raised when replaying a URL that was never recorded
+    """
+
+
+class HttpArchive:
+    """
+    URL-indexed archive of compressed response bodies backed by a single SQLite file
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode must be '{RECORD}' or '{REPLAY}', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        if mode == REPLAY:
+            # Replays touch every page, so the whole (compressed) archive is read up front
+            # and lookups never wait on SQLite
+            conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            try:
+                rows = conn.execute('SELECT url, status, body FROM responses').fetchall()
+            finally:
+                conn.close()
+            self._entries: Dict[str, Tuple[int, bytes]] = {url: (status, body) for url, status, body in rows}
+            self.conn = None
+            logger.info(f"Replaying {len(self._entries)} responses from {path}")
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    content_type TEXT,
+                    body BLOB NOT NULL,
+                    recorded_at REAL NOT NULL
+                )
+            ''')
+            self.conn.commit()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def record(self, url: str, status: int, body: bytes, content_type: Optional[str] = None) -> None:
+        """
+        Store one response, replacing any earlier recording of the same URL
+        """
+        compressed = zlib.compress(body, 9)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                (url, status, content_type, compressed, time.time())
+            )
+            self.conn.commit()
+            self.recorded += 1
+
+    def replay(self, url: str) -> bytes:
+        """
+        Return the recorded body for url
+
+        Raises ArchiveMiss if the URL was never recorded and requests.HTTPError
+        if it was recorded with an error status.
+        """
+        entry = self._entries.get(url)
+        with self.lock:
+            if entry is None:
+                self.missed += 1
+            else:
+                self.replayed += 1
+        if entry is None:
+            raise ArchiveMiss(f"{url} is not in the archive {self.path}")
+        status, body = entry
+        if status >= 400:
+            raise requests.HTTPError(f"{status} Error (replayed) for url: {url}")
+        return zlib.decompress(body)
+
+    def log_stats(self) -> None:
+        if self.replaying:
+            logger.info(f"HTTP archive {self.path}: {self.replayed} replayed, {self.missed} missing")
+        else:
+            logger.info(f"HTTP archive {self.path}: {self.recorded} responses recorded")
+
+    def close(self) -> None:
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+                self.conn = None
+
@@ -0,0 +1,193 @@
+"""
+Persistent on-disk HTTP response cache for IMDB page fetches
+
+Bodies are stored zlib-compressed in a SQLite file together with their ETag
+and Last-Modified validators. Entries are served directly while younger than
+the TTL of their URL class and revalidated with a conditional GET afterwards,
+so a re-run mostly costs 304s. The file is kept under a byte budget by
+evicting the least recently used entries.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'http_cache.sqlite'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 24 * 60 * 60
+
+# (URL pattern, TTL in seconds), first match wins. Season listings carry the
+# drifting ratings and vote counts; episode credit pages almost never change.
+DEFAULT_TTL_RULES: List[Tuple[Pattern, int]] = [
+    (re.compile(r'/episodes/'), 6 * 60 * 60),
+    (re.compile(r'/title/tt\d+/?(\?|$)'), 30 * 24 * 60 * 60),
+]
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    ttl: int
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - self.fetched_at < self.ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Request headers that turn a GET for this entry into a conditional GET
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    Size-bounded LRU response cache backed by a single SQLite file
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_rules: Optional[List[Tuple[Pattern, int]]] = None, default_ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_rules = DEFAULT_TTL_RULES if ttl_rules is None else ttl_rules
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # Crawler worker processes share one cache file: WAL lets readers run alongside a
+        # writer, and the timeout makes a writer wait its turn instead of failing
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self.conn.commit()
+
+    def ttl_for(self, url: str) -> int:
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Look up a cached response, marking it as recently used
+        """
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), url))
+            self.conn.commit()
+        body, etag, last_modified, fetched_at = row
+        return CacheEntry(zlib.decompress(body), etag, last_modified, fetched_at, self.ttl_for(url))
+
+    def put(self, url: str, body: bytes, headers) -> None:
+        """
+        Store a full response body with its validators, evicting old entries if over budget
+        """
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, compressed, headers.get('ETag'), headers.get('Last-Modified'), now, now, len(compressed))
+            )
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, url: str, headers) -> None:
+        """
+        Restart an entry's TTL after a 304, picking up any new validators
+        """
+        with self.lock:
+            self.conn.execute(
+                'UPDATE responses SET fetched_at = ?, etag = COALESCE(?, etag), '
+                'last_modified = COALESCE(?, last_modified) WHERE url = ?',
+                (time.time(), headers.get('ETag'), headers.get('Last-Modified'), url)
+            )
+            self.conn.commit()
+
+    def stored_bytes(self) -> int:
+        """
+        Compressed size of every stored body, as the database holds it now
+        """
+        with self.lock:
+            return self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def _evict(self) -> None:
+        # Caller holds the lock and is inside put's write transaction, so no other
+        # process sharing the file can change the total until the commit
+        total = self._stored_bytes()
+        while total > self.max_bytes:
+            row = self.conn.execute('SELECT url, size FROM responses ORDER BY last_access LIMIT 1').fetchone()
+            if row is None:
+                break
+            self.conn.execute('DELETE FROM responses WHERE url = ?', (row[0],))
+            total -= row[1]
+            logger.debug(f"Evicted {row[0]} from HTTP cache")
+
+    def record(self, outcome: str) -> None:
+        """
+        Count a lookup outcome: 'hit', 'revalidated' or 'miss'
+        """
+        with self.lock:
+            if outcome == 'hit':
+                self.hits += 1
+            elif outcome == 'revalidated':
+                self.revalidations += 1
+            else:
+                self.misses += 1
+
+    def hit_ratio(self) -> float:
+        """
+        Share of lookups answered without a full download (fresh hits and 304s)
+        """
+        total = self.hits + self.revalidations + self.misses
+        return (self.hits + self.revalidations) / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio(),
+            'stored_bytes': self.stored_bytes(),
+        }
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"HTTP cache: {self.hits} hits, {self.revalidations} revalidated, {self.misses} misses "
+            f"(hit ratio {self.hit_ratio():.0%}, {self.stored_bytes() / 1024:.0f} KiB stored)"
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
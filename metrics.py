@@ -0,0 +1,236 @@
+"""
+Per-request and per-parse instrumentation for scraper runs
+
+The Fetcher records one FetchSample per page it returns or fails on. Each
+sample holds where the body came from, the status and the bytes. It also
+splits the request time: rate limiter sleep, time to response headers
+(connect, TLS and server wait; requests does not expose DNS separately)
+and body download. ParseStage records one duration per parse call. At the
+end of a run, RunMetrics builds a report with p50/p95 latencies per page
+type, as JSON and in Prometheus text exposition format:
+
+    python3 scrape_curb_episodes.py --with-credits --metrics run_metrics
+    # -> run_metrics.json and run_metrics.prom
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95)
+METRIC_PREFIX = 'curb'
+
+# Where a fetched body came from
+NETWORK = 'network'
+CACHE = 'cache'
+REVALIDATED = 'revalidated'
+ARCHIVE = 'archive'
+
+
+class FetchSample(NamedTuple):
+    url: str
+    page_type: str
+    source: str
+    status: int           # 0 when no response arrived
+    seconds: float        # total, including the limiter sleep
+    limiter_seconds: float
+    headers_seconds: float  # request sent -> response headers parsed
+    bytes: int
+    retries: int
+    started: float        # seconds since the run started
+
+
+def page_type(url: str) -> str:
+    """
+    Classify an IMDB URL as 'season', 'series', 'episode' or 'other'
+    """
+    parts = urlsplit(url)
+    if 'season=' in parts.query:
+        return 'season'
+    if parts.path.rstrip('/').endswith('/episodes'):
+        return 'series'
+    if parts.path.startswith('/title/'):
+        return 'episode'
+    return 'other'
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Linearly interpolated q-quantile of values, or None if there are none
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    summary = {f'p{int(q * 100)}': percentile(values, q) for q in QUANTILES}
+    summary['max'] = max(values) if values else None
+    summary['total'] = sum(values)
+    return {key: None if value is None else round(value, 6) for key, value in summary.items()}
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for one scraper run
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.fetches: List[FetchSample] = []
+        self.parses: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._clock
+
+    def record_fetch(self, url: str, source: str, status: int, seconds: float, limiter_seconds: float = 0.0,
+                     headers_seconds: float = 0.0, size: int = 0, retries: int = 0) -> None:
+        sample = FetchSample(url, page_type(url), source, status, seconds, limiter_seconds, headers_seconds,
+                             size, retries, self.elapsed() - seconds)
+        with self.lock:
+            self.fetches.append(sample)
+
+    def record_parse(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.parses.setdefault(stage, []).append(seconds)
+
+    def report(self, include_requests: bool = True) -> Dict:
+        """
+        Run report: totals, per-page-type fetch latencies and per-stage parse durations
+        """
+        with self.lock:
+            fetches = list(self.fetches)
+            parses = {stage: list(durations) for stage, durations in self.parses.items()}
+
+        page_types: Dict[str, Dict] = {}
+        for kind in sorted({sample.page_type for sample in fetches}):
+            samples = [sample for sample in fetches if sample.page_type == kind]
+            network = [sample for sample in samples if sample.source in (NETWORK, REVALIDATED)]
+            statuses: Dict[str, int] = {}
+            sources: Dict[str, int] = {}
+            for sample in samples:
+                statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+                sources[sample.source] = sources.get(sample.source, 0) + 1
+            page_types[kind] = {
+                'requests': len(samples),
+                'bytes': sum(sample.bytes for sample in samples),
+                'retries': sum(sample.retries for sample in samples),
+                'statuses': statuses,
+                'sources': sources,
+                'seconds': _distribution([sample.seconds for sample in samples]),
+                # Network-only splits; cache and archive answers have no request to time
+                'headers_seconds': _distribution([sample.headers_seconds for sample in network]),
+                'download_seconds': _distribution([sample.seconds - sample.limiter_seconds - sample.headers_seconds
+                                                   for sample in network]),
+                'limiter_seconds': _distribution([sample.limiter_seconds for sample in samples]),
+            }
+
+        report = {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.started)),
+            'duration_seconds': round(self.elapsed(), 3),
+            'totals': {
+                'requests': len(fetches),
+                'errors': sum(1 for sample in fetches if not 200 <= sample.status < 400),
+                'bytes': sum(sample.bytes for sample in fetches),
+                'retries': sum(sample.retries for sample in fetches),
+                'limiter_sleep_seconds': round(sum(sample.limiter_seconds for sample in fetches), 6),
+            },
+            'page_types': page_types,
+            'parse': {stage: dict(_distribution(durations), calls=len(durations))
+                      for stage, durations in sorted(parses.items())},
+        }
+        if include_requests:
+            report['requests'] = [dict(sample._asdict(), seconds=round(sample.seconds, 6),
+                                       limiter_seconds=round(sample.limiter_seconds, 6),
+                                       headers_seconds=round(sample.headers_seconds, 6),
+                                       started=round(sample.started, 6))
+                                  for sample in sorted(fetches, key=lambda sample: sample.started)]
+        return report
+
+    def to_prometheus(self) -> str:
+        """
+        The run report as Prometheus text exposition format
+        """
+        report = self.report(include_requests=False)
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str) -> None:
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+
+        def sample(name: str, labels: Dict[str, str], value) -> None:
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+            lines.append(f'{METRIC_PREFIX}_{name}{{{label_text}}} {value}' if label_text
+                         else f'{METRIC_PREFIX}_{name} {value}')
+
+        def summary(name: str, labels: Dict[str, str], distribution: Dict, count: int) -> None:
+            for q in QUANTILES:
+                value = distribution[f'p{int(q * 100)}']
+                sample(name, dict(labels, quantile=str(q)), 'NaN' if value is None else value)
+            sample(f'{name}_sum', labels, distribution['total'])
+            sample(f'{name}_count', labels, count)
+
+        page_types = report['page_types']
+        metric('fetch_requests_total', 'counter', 'Pages fetched, by page type and status')
+        for kind, stats in page_types.items():
+            for status, count in stats['statuses'].items():
+                sample('fetch_requests_total', {'page_type': kind, 'status': status}, count)
+        metric('fetch_source_total', 'counter', 'Pages fetched, by where the body came from')
+        for kind, stats in page_types.items():
+            for source, count in stats['sources'].items():
+                sample('fetch_source_total', {'page_type': kind, 'source': source}, count)
+        metric('fetch_bytes_total', 'counter', 'Response body bytes, by page type')
+        for kind, stats in page_types.items():
+            sample('fetch_bytes_total', {'page_type': kind}, stats['bytes'])
+        metric('fetch_retries_total', 'counter', 'Retries, by page type: Fetcher retry attempts plus retries urllib3 made within an attempt')
+        for kind, stats in page_types.items():
+            sample('fetch_retries_total', {'page_type': kind}, stats['retries'])
+        metric('fetch_seconds', 'summary', 'Fetch latency including rate limiter sleep')
+        for kind, stats in page_types.items():
+            summary('fetch_seconds', {'page_type': kind}, stats['seconds'], stats['requests'])
+        metric('fetch_headers_seconds', 'summary', 'Network request time to response headers')
+        for kind, stats in page_types.items():
+            network = stats['sources'].get(NETWORK, 0) + stats['sources'].get(REVALIDATED, 0)
+            summary('fetch_headers_seconds', {'page_type': kind}, stats['headers_seconds'], network)
+        metric('limiter_sleep_seconds_total', 'counter', 'Time spent waiting on the per-host rate limiter')
+        sample('limiter_sleep_seconds_total', {}, report['totals']['limiter_sleep_seconds'])
+        metric('parse_seconds', 'summary', 'Parse call duration, by parse function')
+        for stage, stats in report['parse'].items():
+            summary('parse_seconds', {'stage': stage}, stats, stats['calls'])
+        metric('run_duration_seconds', 'gauge', 'Wall time of the run so far')
+        sample('run_duration_seconds', {}, report['duration_seconds'])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, basename: str) -> None:
+        """
+        Write <basename>.json and <basename>.prom
+        """
+        with open(f'{basename}.json', 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+        with open(f'{basename}.prom', 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        logger.info(f"Saved run metrics to {basename}.json and {basename}.prom")
+
+    def log_summary(self) -> None:
+        """
+        One log line per page type with request count, bytes and latency percentiles
+        """
+        report = self.report(include_requests=False)
+        for kind, stats in report['page_types'].items():
+            seconds = stats['seconds']
+            logger.info(f"{kind} pages: {stats['requests']} requests, {stats['bytes'] / 1024:.0f} KiB, "
+                        f"p50 {seconds['p50'] * 1000:.0f} ms, p95 {seconds['p95'] * 1000:.0f} ms")
+        logger.info(f"Rate limiter sleep: {report['totals']['limiter_sleep_seconds']:.2f}s "
+                    f"over {report['totals']['requests']} requests")
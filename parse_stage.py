@@ -0,0 +1,69 @@
+"""
+CPU-bound parse stage, separate from network I/O
+
+Fetch threads hand raw page bytes to a ParseStage and get plain
+episode/credit records back. With workers > 0 the parsing runs in a
+ProcessPoolExecutor, so BeautifulSoup work is not serialised by the GIL and
+does not hold up fetching. With workers == 0 it runs inline in the calling
+thread, which is the serial fallback.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from metrics import RunMetrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARSE_WORKERS = 0
+
+
+class ParseStage:
+    """
+    Runs module-level parse functions inline or on a process pool
+    """
+
+    def __init__(self, workers: int = DEFAULT_PARSE_WORKERS, metrics: Optional[RunMetrics] = None):
+        if workers < 0:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.metrics = metrics
+        self.executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(max_workers=workers) if workers else None
+        if workers:
+            logger.info(f"Parsing on {workers} worker processes")
+
+    def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Call fn(*args) and return its result
+
+        fn and its arguments must be picklable when running on the pool. The
+        calling thread blocks on the result but releases the GIL meanwhile.
+        With metrics set, the call's duration is recorded under fn's name; on
+        the pool that includes the round trip to the worker.
+        """
+        start = time.perf_counter()
+        try:
+            if self.executor is None:
+                return fn(*args)
+            return self.executor.submit(fn, *args).result()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_parse(fn.__name__, time.perf_counter() - start)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Shared inline stage for callers that do not configure one
+SERIAL = ParseStage(0)
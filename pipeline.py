@@ -0,0 +1,173 @@
+"""
+Streaming scrape pipeline: season listings -> episodes -> credits -> sinks
+
+Season listings are fetched one after another on a dedicated listing
+thread. As soon as a season is parsed, its episode-page fetches are queued
+on the shared fetcher pool, so credit fetches overlap with the remaining
+listing downloads. Rows come out of run() in dataset order as soon as they
+and everything before them are complete, and sinks write them to disk as
+they arrive.
+
+A page that fails after the fetcher's retries does not stop the stream.
+A failed season listing falls back to the season's rows in known_credits,
+and a failed episode page to that episode's known credits. Either way the
+page is recorded in the scraper's dead letters. When there is nothing to
+fall back on, the season or episode is noted in the scraper's
+missing_seasons or missing_credits, and the scraper then keeps the
+existing output files.
+"""
+
+import csv
+import json
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from dataset_io import file_hash
+from episode import FIELDNAMES, Episode
+from fetcher import absolute_url
+
+logger = logging.getLogger(__name__)
+
+
+class EpisodePipeline:
+    """
+    Fused listing scrape and credits enrichment for a CurbEpisodeScraper
+
+    known_credits maps (season, episode) to episodes whose director/writer
+    are reused instead of fetching the episode page again.
+    """
+
+    def __init__(self, scraper, known_credits: Optional[Dict[Tuple[int, int], Episode]] = None):
+        self.scraper = scraper
+        self.fetcher = scraper.fetcher
+        self.known_credits = known_credits or {}
+        self.credit_fetches = 0
+
+    def run(self, max_seasons: int = 12) -> Iterator[Episode]:
+        """
+        Yield enriched episodes in (season, episode) order
+        """
+        listing = ThreadPoolExecutor(max_workers=1, thread_name_prefix='listing')
+        try:
+            season_futures = [listing.submit(self._season_job, season) for season in range(1, max_seasons + 1)]
+            for season_future in season_futures:
+                for row_future in season_future.result():
+                    yield row_future.result()
+        finally:
+            listing.shutdown(wait=False, cancel_futures=True)
+
+    def _season_job(self, season: int) -> List[Future]:
+        episodes = self.scraper.try_season_episodes(season)
+        if episodes is None:
+            episodes = [known for key, known in sorted(self.known_credits.items()) if key[0] == season]
+            if episodes:
+                logger.warning(f"Keeping the {len(episodes)} previously saved episodes of season {season}")
+            else:
+                self.scraper.missing_seasons.add(season)
+        return [self._enrich(episode) for episode in episodes]
+
+    def _enrich(self, episode: Episode) -> Future:
+        known = self.known_credits.get(episode.key)
+        if known is not None:
+            episode.director = known.director
+            episode.writer = known.writer
+        if episode.has_credits:
+            done = Future()
+            done.set_result(episode)
+            return done
+        self.credit_fetches += 1
+        return self.fetcher.submit(self._fetch_credits, episode)
+
+    def _fetch_credits(self, episode: Episode) -> Episode:
+        url = self.scraper.episode_urls.get(episode.key)
+        try:
+            director, writer = self.scraper._get_episode_credits(url)
+        except requests.RequestException as e:
+            self.scraper.dead_letters.add(absolute_url(url), 'credits', e, season=episode.season, episode=episode.episode)
+            # Known credits were already copied in by _enrich(); without any, saving would blank the row
+            if episode.key not in self.known_credits:
+                self.scraper.missing_credits.add(episode.key)
+            return episode
+        episode.director = episode.director or director
+        episode.writer = episode.writer or writer
+        return episode
+
+
+class _FileSink:
+    """
+    Writes episodes to a temporary file and swaps it in on close, only if the
+    content differs from what is already on disk
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.file = open(self.tmp_path, 'w', newline='', encoding='utf-8')
+        self.count = 0
+
+    def write(self, episode: Episode) -> None:
+        self._write(episode)
+        self.count += 1
+
+    def _write(self, episode: Episode) -> None:
+        raise NotImplementedError
+
+    def _finish(self) -> None:
+        pass
+
+    def close(self) -> bool:
+        """
+        Finish the file; returns True if the output on disk changed
+        """
+        self._finish()
+        self.file.close()
+        if file_hash(self.tmp_path) == file_hash(self.path):
+            os.remove(self.tmp_path)
+            logger.info(f"{self.path} unchanged, not rewriting")
+            return False
+        os.replace(self.tmp_path, self.path)
+        logger.info(f"Saved {self.count} episodes to {self.path}")
+        return True
+
+    def discard(self) -> None:
+        """
+        Abandon the output, leaving any existing file untouched
+        """
+        self.file.close()
+        os.remove(self.tmp_path)
+
+
+class CsvSink(_FileSink):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDNAMES)
+
+    def _write(self, episode: Episode) -> None:
+        self.writer.writerow(episode.to_csv_values())
+
+
+class JsonSink(_FileSink):
+    """
+    Streams a JSON array laid out exactly like json.dump(rows, indent=2)
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.file.write('[')
+
+    def _write(self, episode: Episode) -> None:
+        element = json.dumps(episode.to_json_dict(), indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        self.file.write((',\n  ' if self.count else '\n  ') + element)
+
+    def _finish(self) -> None:
+        self.file.write('\n]' if self.count else ']')
+
+
+class NdjsonSink(_FileSink):
+    def _write(self, episode: Episode) -> None:
+        self.file.write(json.dumps(episode.to_json_dict(), ensure_ascii=False) + '\n')
@@ -0,0 +1,210 @@
+"""
+Retry scheduling, circuit breaking and dead letters for page fetches
+
+The Fetcher retries a transient failure (timeout, connection error, 429
+or 5xx) with exponential backoff and full jitter. When the response
+carries a Retry-After header, it waits at least that long. Each host
+has a circuit breaker: once breaker_threshold different pages have failed
+with no success in between, the breaker opens. Counting pages rather than
+attempts keeps one persistently broken page, retried several times, from
+opening it. While it is open, requests to that host fail
+immediately with CircuitOpenError instead of adding load to a struggling
+server. After breaker_cooldown seconds, one trial request is let through
+to test the host while the other workers wait for its outcome.
+
+A page that still fails is not swallowed: the caller records it in a
+DeadLetters file and the run reports the failure. The next run reads the
+file, logs which pages it is retrying, and only has to fetch those; pages
+that succeeded are reused from the outputs, the journal or the HTTP cache.
+"""
+
+import datetime
+import email.utils
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import requests
+
+from curb.config import DEFAULT_DEAD_LETTER_PATH
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised instead of sending a request to a host whose circuit breaker is open
+    """
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    # Longest Retry-After the scraper will honour; anything longer fails the page
+    max_retry_after: float = 300.0
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 60.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to wait before retry number `attempt` (1-based), or None to give up
+        """
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            # A little jitter stops every worker from returning in the same instant
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+NO_RETRIES = RetryPolicy(max_attempts=1)
+
+
+def is_retryable(error: requests.RequestException) -> bool:
+    """
+    True for failures that may succeed on a later attempt
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in RETRYABLE_STATUSES
+
+
+def retry_after_seconds(error: requests.RequestException) -> Optional[float]:
+    """
+    The Retry-After of a failed response in seconds, from either delta-seconds or an HTTP date
+    """
+    response = getattr(error, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one host that opens after `threshold` pages fail in a row
+
+    Closed, requests pass. Open, they fail with CircuitOpenError until the
+    cooldown ends. Then the breaker is half-open: one trial request goes
+    through and every other caller waits for its outcome. Success closes
+    the breaker; failure opens it for another cooldown.
+    """
+
+    def __init__(self, host: str, threshold: int, cooldown: float):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # Pages that failed since the last success
+        self.failing: Set[str] = set()
+        self.opened_at: Optional[float] = None
+        # True while the half-open trial request is in flight
+        self.trial = False
+        self.lock = threading.Lock()
+        self.settled = threading.Condition(self.lock)
+
+    def before_request(self) -> None:
+        """
+        Raise CircuitOpenError while the breaker is open; when half-open, let one
+        caller through and hold the others until its request settles
+        """
+        with self.lock:
+            while self.opened_at is not None:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    raise CircuitOpenError(f"circuit open for {self.host} after {len(self.failing)} pages failed in a row")
+                if not self.trial:
+                    self.trial = True
+                    logger.info(f"Circuit for {self.host} half-open; sending one trial request")
+                    return
+                self.settled.wait()
+
+    def record_success(self) -> None:
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.host} closed")
+            self.failing.clear()
+            self.opened_at = None
+            self.trial = False
+            self.settled.notify_all()
+
+    def record_failure(self, url: str) -> None:
+        with self.lock:
+            self.failing.add(url)
+            if self.trial:
+                logger.error(f"Trial request to {self.host} failed; pausing requests for another {self.cooldown:.0f}s")
+                self.opened_at = time.monotonic()
+                self.trial = False
+                self.settled.notify_all()
+            elif self.opened_at is None and len(self.failing) >= self.threshold:
+                logger.error(f"Circuit for {self.host} opened after {len(self.failing)} pages failed in a row; "
+                             f"pausing requests for {self.cooldown:.0f}s")
+                self.opened_at = time.monotonic()
+
+
+class DeadLetters:
+    """
+    Pages that failed for good in this run, saved for the next one
+
+    With path=None the list is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_DEAD_LETTER_PATH):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.previous = self._load()
+        if self.previous:
+            logger.info(f"Retrying {len(self.previous)} pages that failed in the last run "
+                        f"({', '.join(entry['url'] for entry in self.previous[:3])}"
+                        f"{', ...' if len(self.previous) > 3 else ''})")
+
+    def _load(self) -> List[Dict]:
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def add(self, url: str, kind: str, error: Exception, **context) -> None:
+        """
+        Record a page that failed after all retries
+        """
+        logger.error(f"Giving up on {kind} page {url}: {error}")
+        with self.lock:
+            self.entries[url] = dict(context, url=url, kind=kind, error=str(error),
+                                     failed_at=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self) -> None:
+        """
+        Write this run's failures, or remove the file when everything succeeded
+        """
+        if not self.path:
+            return
+        if self.entries:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(self.entries.values(), key=lambda entry: entry['url']), f, indent=2)
+                f.write('\n')
+            logger.error(f"{len(self.entries)} pages failed; listed in {self.path} for the next run")
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+            logger.info(f"All previously failed pages succeeded; removed {self.path}")
@@ -7,247 +7,257 @@ Curb Your Enthusiasm from IMDB.
 """
 
 import requests
-from bs4 import BeautifulSoup
-import csv
-import json
-import time
-import re
-from typing import List, Dict, Optional
+import argparse
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from analytics import summarize, write_summary
+from credit_parser import extract_credits, primary_credits
+from columnar import write_columnar
+from curb.config import (DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, FetchStores, add_fetch_arguments,
+                         configure_logging, open_fetch_stores)
+from curb.summary import print_summary
+from dataset_io import load_csv_episodes, render_csv, render_json, write_if_changed
+from episode import Episode
+from search_index import write_search_index
+from pipeline import CsvSink, EpisodePipeline, JsonSink, NdjsonSink
+from fetcher import Fetcher, absolute_url
+from http_archive import HttpArchive
+from http_cache import HttpCache
+from metrics import RunMetrics
+from parse_stage import DEFAULT_PARSE_WORKERS, ParseStage
+from retry import DeadLetters
+from season_parser import (CURB_TITLE_ID, SEASON_URL, SERIES_EPISODES_URL, extract_episode_data,
+                           parse_season_count, parse_season_page)
+from snapshot_store import DEFAULT_SNAPSHOT_PATH, SnapshotStore
+
 logger = logging.getLogger(__name__)
 
 class CurbEpisodeScraper:
-    def __init__(self):
-        self.base_url = "https://www.imdb.com/title/tt0264235/episodes/?season={}&ref_=ttep"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 max_workers: int = DEFAULT_MAX_WORKERS, fetcher: Optional[Fetcher] = None,
+                 cache: Optional[HttpCache] = None, parse_workers: int = DEFAULT_PARSE_WORKERS,
+                 title_id: str = CURB_TITLE_ID, archive: Optional[HttpArchive] = None,
+                 snapshots: Optional[SnapshotStore] = None, metrics: Optional[RunMetrics] = None,
+                 dead_letters: Optional[DeadLetters] = None):
+        self.title_id = title_id
+        self.metrics = metrics
+        # Every completed scrape appends its ratings and votes here
+        self.snapshots = snapshots
+        self.base_url = SEASON_URL.format(title_id=title_id, season='{}')
+        self.fetcher = fetcher or Fetcher(requests_per_second=requests_per_second, max_workers=max_workers,
+                                          cache=cache, archive=archive, metrics=metrics)
+        self.session = self.fetcher.session
+        # Parsing runs inline, or on worker processes when parse_workers > 0
+        self.parse_stage = ParseStage(parse_workers, metrics)
         self.episodes = []
+        # Rating summary of the last save_with_credits() run
+        self.summary = None
+        # Episode page links seen in the season listings, keyed by (season, episode)
+        self.episode_urls = {}
+        # Pages that failed after all retries, and the seasons and episode credits they left
+        # with nothing to fall back on
+        self.dead_letters = dead_letters if dead_letters is not None else DeadLetters(None)
+        self.missing_seasons = set()
+        self.missing_credits = set()
         
-    def get_season_episodes(self, season_num: int) -> List[Dict]:
+    def get_season_episodes(self, season_num: int) -> List[Episode]:
         """
         Scrape episode data for a specific season
+        
+        Raises requests.RequestException if the listing cannot be fetched.
         """
         url = self.base_url.format(season_num)
         logger.info(f"Scraping season {season_num}: {url}")
         
+        content = self.fetcher.fetch(url)
+        
+        # Only the episode containers are parsed out of the page
+        episodes, episode_urls = self.parse_stage.run(parse_season_page, content, season_num)
+        self.episode_urls.update(episode_urls)
+                
+        logger.info(f"Found {len(episodes)} episodes in season {season_num}")
+        return episodes
+    
+    def try_season_episodes(self, season_num: int) -> Optional[List[Episode]]:
+        """
+        get_season_episodes(), but a listing that failed for good is recorded
+        as a dead letter and comes back as None
+        """
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            episodes = []
-            
-            # Find all episode containers
-            episode_containers = soup.find_all('article', class_='episode-item-wrapper')
-            
-            for container in episode_containers:
-                episode_data = self._extract_episode_data(container, season_num)
-                if episode_data:
-                    episodes.append(episode_data)
-                    
-            logger.info(f"Found {len(episodes)} episodes in season {season_num}")
-            return episodes
-            
+            return self.get_season_episodes(season_num)
         except requests.RequestException as e:
-            logger.error(f"Error fetching season {season_num}: {e}")
-            return []
+            self.dead_letters.add(self.base_url.format(season_num), 'season', e, season=season_num)
+            return None
             
-    def _extract_episode_data(self, container, season_num: int) -> Optional[Dict]:
+    def _extract_episode_data(self, container, season_num: int) -> Optional[Episode]:
         """
         Extract episode data from a container element
         """
-        try:
-            # Episode title and number
-            title_elem = container.find('a', class_='ipc-title-link-wrapper')
-            if not title_elem:
-                return None
-                
-            title_text = title_elem.get_text(strip=True)
-            episode_url = title_elem.get('href')
-            
-            # Extract episode number and title from format "S1.E1 ∙ The Pants Tent"
-            episode_num = None
-            title = title_text
-            
-            # Parse episode number from title
-            match = re.search(r'S\d+\.E(\d+)\s*[∙·]\s*(.+)', title_text)
-            if match:
-                episode_num = int(match.group(1))
-                title = match.group(2).strip()
-            
-            # Air date
-            air_date_elem = container.find('span', class_='sc-a388aa45-10')
-            air_date = air_date_elem.get_text(strip=True) if air_date_elem else None
-            
-            # Rating
-            rating_elem = container.find('span', class_='ipc-rating-star--rating')
-            rating = None
-            if rating_elem:
-                rating_text = rating_elem.get_text(strip=True)
-                try:
-                    rating = float(rating_text)
-                except ValueError:
-                    pass
-            
-            # Vote count
-            votes_elem = container.find('span', class_='ipc-rating-star--voteCount')
-            votes = None
-            if votes_elem:
-                votes_text = votes_elem.get_text(strip=True)
-                # Remove parentheses and convert to number
-                votes_text = votes_text.replace('(', '').replace(')', '').replace(',', '').replace(' ', '')
-                try:
-                    if 'K' in votes_text:
-                        votes = int(float(votes_text.replace('K', '')) * 1000)
-                    elif 'M' in votes_text:
-                        votes = int(float(votes_text.replace('M', '')) * 1000000)
-                    else:
-                        votes = int(votes_text)
-                except (ValueError, TypeError):
-                    pass
-            
-            # Description/plot
-            description_elem = container.find('div', class_='ipc-html-content-inner-div')
-            description = description_elem.get_text(strip=True) if description_elem else None
-            
-            # Get director and writer information from episode page
-            # Temporarily disabled due to complexity - will create separate script
-            director, writer = None, None
-            
-            return {
-                'season': season_num,
-                'episode': episode_num,
-                'title': title,
-                'air_date': air_date,
-                'rating': rating,
-                'votes': votes,
-                'description': description,
-                'director': director,
-                'writer': writer
-            }
-            
-        except Exception as e:
-            logger.error(f"Error extracting episode data: {e}")
-            return None
+        return extract_episode_data(container, season_num, self.episode_urls)
     
     def _get_episode_credits(self, episode_url: str) -> tuple:
         """
         Get director and writer information from an episode page
+        
+        Raises requests.RequestException if the page cannot be fetched.
         """
         if not episode_url:
             return None, None
             
         # Construct full URL if relative
-        if episode_url.startswith('/'):
-            episode_url = 'https://www.imdb.com' + episode_url
-            
-        try:
-            logger.info(f"Fetching credits from: {episode_url}")
-            response = self.session.get(episode_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find director and writer information using a simple approach
-            director = None
-            writer = None
-            
-            # Look for all name links (people)
-            all_links = soup.find_all('a')
-            
-            # Look for spans containing "Director" or "Writer" text
-            director_found = False
-            writer_found = False
-            
-            for link in all_links:
-                if director_found and writer_found:
-                    break
-                    
-                href = link.get('href', '')
-                if '/name/nm' not in href:
-                    continue
-                    
-                # Check the surrounding context for director/writer indicators
-                parent_element = link.parent
-                if parent_element:
-                    # Get the text of nearby elements
-                    for _ in range(3):  # Check up to 3 levels up
-                        if parent_element:
-                            context_text = parent_element.get_text()
-                            
-                            if 'Director' in context_text and not director_found:
-                                director = link.get_text(strip=True)
-                                director_found = True
-                                break
-                            elif 'Writer' in context_text and not writer_found:
-                                writer = link.get_text(strip=True)
-                                writer_found = True
-                                break
-                            
-                            parent_element = parent_element.parent
-            
-            # Rate limit to be respectful
-            time.sleep(0.5)
+        episode_url = absolute_url(episode_url)
             
-            logger.info(f"Found credits - Director: {director}, Writer: {writer}")
-            return director, writer
-            
-        except Exception as e:
-            logger.error(f"Error fetching credits from {episode_url}: {e}")
-            return None, None
+        logger.info(f"Fetching credits from: {episode_url}")
+        content = self.fetcher.fetch(episode_url)
+        
+        director, writer = primary_credits(self.parse_stage.run(extract_credits, content))
+        
+        logger.info(f"Found credits - Director: {director}, Writer: {writer}")
+        return director, writer
     
-    def scrape_all_seasons(self, max_seasons: int = 12) -> List[Dict]:
+    def discover_season_count(self) -> int:
+        """
+        Read the number of seasons from the series' season tabs
+        """
+        content = self.fetcher.fetch(SERIES_EPISODES_URL.format(title_id=self.title_id))
+        season_count = parse_season_count(content)
+        logger.info(f"{self.title_id} has {season_count} seasons")
+        return season_count
+    
+    def scrape_all_seasons(self, max_seasons: Optional[int] = 12) -> List[Episode]:
         """
         Scrape all seasons of Curb Your Enthusiasm
+        
+        Pass max_seasons=None to discover the season count from IMDB.
+        
+        Seasons are fetched concurrently on the shared fetcher; the per-host
+        rate limit, not a fixed sleep, keeps the request rate polite. Seasons
+        whose listing failed are left out and noted in self.missing_seasons.
         """
+        if max_seasons is None:
+            max_seasons = self.discover_season_count()
         all_episodes = []
         
-        for season in range(1, max_seasons + 1):
-            episodes = self.get_season_episodes(season)
+        seasons = range(1, max_seasons + 1)
+        for season, episodes in zip(seasons, self.fetcher.map(self.try_season_episodes, seasons)):
+            if episodes is None:
+                self.missing_seasons.add(season)
+                continue
             all_episodes.extend(episodes)
             
-            # Be respectful with rate limiting
-            time.sleep(1)
-            
         self.episodes = all_episodes
+        self.record_snapshot()
         return all_episodes
     
-    def save_to_csv(self, filename: str = 'curb_episodes.csv'):
+    def stream_with_credits(self, max_seasons: Optional[int] = 12,
+                            known_credits: Optional[Dict] = None) -> Iterator[Episode]:
+        """
+        Scrape listings and credits in one streaming pass, yielding episodes in dataset order
+        
+        Episode pages are fetched while later season listings are still
+        downloading. Credits found in known_credits (keyed by (season, episode))
+        are reused instead of fetching the episode page. The episodes are also
+        collected in self.episodes.
+        """
+        if max_seasons is None:
+            max_seasons = self.discover_season_count()
+        self.episodes = []
+        pipeline = EpisodePipeline(self, known_credits)
+        for episode in pipeline.run(max_seasons):
+            self.episodes.append(episode)
+            yield episode
+        logger.info(f"Fetched credits for {pipeline.credit_fetches} of {len(self.episodes)} episodes")
+        self.record_snapshot()
+    
+    def record_snapshot(self):
         """
-        Save episode data to CSV file
+        Append the scraped ratings and votes to the snapshot store, if there is one
         """
-        if not self.episodes:
+        if self.snapshots is not None and self.episodes:
+            self.snapshots.record(self.title_id, self.episodes)
+    
+    def save_with_credits(self, episodes: Iterable[Episode], basename: str = 'curb_episodes_with_credits') -> int:
+        """
+        Stream episodes into the CSV, JSON and NDJSON credits files as they arrive,
+        then write the columnar files and search index the visualization loads
+        
+        Each file is only replaced if its content changed. Nothing is replaced
+        when a season listing or episode page failed with no saved data to
+        fall back on, since the outputs would silently lose that season or
+        those credits. Returns the episode count saved.
+        """
+        sinks = [CsvSink(f'{basename}.csv'), JsonSink(f'{basename}.json'), NdjsonSink(f'{basename}.ndjson')]
+        saved = []
+        for episode in episodes:
+            for sink in sinks:
+                sink.write(episode)
+            saved.append(episode)
+        incomplete = self._refuse_incomplete()
+        for sink in sinks:
+            if saved and not incomplete:
+                sink.close()
+            else:
+                sink.discard()
+        if not saved:
+            logger.warning("No episodes to save")
+            return 0
+        if incomplete:
+            return 0
+        write_columnar(saved, basename)
+        write_search_index(saved, basename)
+        self.summary = write_summary(saved, basename)
+        return len(saved)
+    
+    def _refuse_incomplete(self) -> bool:
+        """
+        Log and return True if seasons or credits are missing, so outputs must not be replaced
+        """
+        if self.missing_seasons:
+            seasons = ', '.join(str(season) for season in sorted(self.missing_seasons))
+            logger.error(f"Season listing(s) {seasons} failed; keeping the existing output files")
+            return True
+        if self.missing_credits:
+            episodes = ', '.join(f'S{season}E{episode}' for season, episode in sorted(self.missing_credits))
+            logger.error(f"Episode page(s) {episodes} failed; keeping the existing output files")
+            return True
+        return False
+    
+    def save_to_csv(self, filename: str = 'curb_episodes.csv', episodes: Optional[List[Episode]] = None):
+        """
+        Save episode data to CSV file, skipping the write if the content is unchanged
+        """
+        episodes = self.episodes if episodes is None else episodes
+        if not episodes:
             logger.warning("No episodes to save")
             return
+        if self._refuse_incomplete():
+            return
             
-        fieldnames = ['season', 'episode', 'title', 'air_date', 'rating', 'votes', 'description', 'director', 'writer']
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for episode in self.episodes:
-                writer.writerow(episode)
-                
-        logger.info(f"Saved {len(self.episodes)} episodes to {filename}")
+        if write_if_changed(filename, render_csv(episodes)):
+            logger.info(f"Saved {len(episodes)} episodes to {filename}")
     
-    def save_to_json(self, filename: str = 'curb_episodes.json'):
+    def save_to_json(self, filename: str = 'curb_episodes.json', episodes: Optional[List[Episode]] = None):
         """
-        Save episode data to JSON file
+        Save episode data to JSON file, skipping the write if the content is unchanged
         """
-        if not self.episodes:
+        episodes = self.episodes if episodes is None else episodes
+        if not episodes:
             logger.warning("No episodes to save")
             return
+        if self._refuse_incomplete():
+            return
             
-        with open(filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(self.episodes, jsonfile, indent=2, ensure_ascii=False)
-            
-        logger.info(f"Saved {len(self.episodes)} episodes to {filename}")
+        if write_if_changed(filename, render_json(episodes)):
+            logger.info(f"Saved {len(episodes)} episodes to {filename}")
+    
+    def close(self):
+        """
+        Shut down the fetch pool and any parse worker processes
+        """
+        self.fetcher.close()
+        self.parse_stage.close()
     
     def print_summary(self):
         """
@@ -256,51 +266,98 @@ class CurbEpisodeScraper:
         if not self.episodes:
             logger.warning("No episodes scraped")
             return
-            
-        seasons = {}
-        total_episodes = len(self.episodes)
-        
-        for episode in self.episodes:
-            season = episode['season']
-            if season not in seasons:
-                seasons[season] = []
-            seasons[season].append(episode)
         
-        print("\n" + "="*60)
-        print("CURB YOUR ENTHUSIASM EPISODE SCRAPING SUMMARY")
-        print("="*60)
-        print(f"Total Episodes: {total_episodes}")
-        print(f"Total Seasons: {len(seasons)}")
-        print("\nEpisodes per Season:")
-        
-        for season in sorted(seasons.keys()):
-            episode_count = len(seasons[season])
-            avg_rating = sum(ep['rating'] for ep in seasons[season] if ep['rating']) / len([ep for ep in seasons[season] if ep['rating']])
-            print(f"  Season {season}: {episode_count} episodes (avg rating: {avg_rating:.1f})")
-        
-        # Find highest and lowest rated episodes
-        rated_episodes = [ep for ep in self.episodes if ep['rating']]
-        if rated_episodes:
-            highest_rated = max(rated_episodes, key=lambda x: x['rating'])
-            lowest_rated = min(rated_episodes, key=lambda x: x['rating'])
-            
-            print(f"\nHighest Rated Episode: S{highest_rated['season']}E{highest_rated['episode']} - {highest_rated['title']} ({highest_rated['rating']}/10)")
-            print(f"Lowest Rated Episode: S{lowest_rated['season']}E{lowest_rated['episode']} - {lowest_rated['title']} ({lowest_rated['rating']}/10)")
+        print_summary(self.summary or summarize(self.episodes))
+
+
+def close_fetch_stores(scraper: CurbEpisodeScraper, stores: FetchStores,
+                       metrics_basename: Optional[str] = None) -> None:
+    """
+    Close the scraper and its snapshot store, then the run's fetch stores
+    """
+    scraper.close()
+    if scraper.snapshots is not None:
+        scraper.snapshots.close()
+    stores.close(metrics_basename)
+
 
+def exit_on_failed_pages(scraper: CurbEpisodeScraper, mode: str) -> None:
+    """
+    Exit with status 1 if any page failed for good, saying how to retry just those
 
-def main():
+    mode is the flag the run used: '--incremental', '--with-credits' or '' for a listings-only scrape.
+    """
+    if not scraper.dead_letters:
+        return
+    if mode == '--incremental':
+        # Saved credits are reused, so only new episodes and the failed pages are fetched
+        rerun = "Rerun with --incremental to fetch only the failed pages"
+    else:
+        command = f"scrape_curb_episodes.py {mode}".rstrip()
+        rerun = (f"Rerun {command}: pages that succeeded are answered from the HTTP cache, "
+                 f"so only the failed pages are fetched again")
+    print(f"\n{len(scraper.dead_letters)} page(s) failed after all retries "
+          f"(see {scraper.dead_letters.path}). {rerun}.")
+    sys.exit(1)
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
     """
     Main function to run the scraper
     """
-    scraper = CurbEpisodeScraper()
+    parser = argparse.ArgumentParser(prog=prog, description="Scrape Curb Your Enthusiasm episode ratings from IMDB")
+    parser.add_argument('--with-credits', action='store_true',
+                        help="fetch episode credits in the same streaming pass and write "
+                             "curb_episodes_with_credits.csv/.json/.ndjson directly")
+    parser.add_argument('--incremental', action='store_true',
+                        help="like --with-credits, but reuse credits from curb_episodes_with_credits.csv "
+                             "and only fetch episode pages for new episodes or missing credits")
+    parser.add_argument('--seasons', type=int, default=None,
+                        help="number of seasons to scrape (default: discover from IMDB)")
+    parser.add_argument('--title-id', default=CURB_TITLE_ID,
+                        help=f"IMDB title id of the series (default: {CURB_TITLE_ID})")
+    parser.add_argument('--parse-workers', type=int, default=DEFAULT_PARSE_WORKERS,
+                        help="worker processes for HTML parsing; 0 parses inline, -1 uses every core "
+                             f"(default: {DEFAULT_PARSE_WORKERS})")
+    parser.add_argument('--snapshots', default=DEFAULT_SNAPSHOT_PATH,
+                        help=f"rating/vote history database each run appends to (default: {DEFAULT_SNAPSHOT_PATH})")
+    parser.add_argument('--no-snapshots', action='store_true',
+                        help="don't record this run in the snapshot history")
+    add_fetch_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    stores = open_fetch_stores(args)
+    # Replayed values are old, so they would be recorded in the history at the wrong time
+    snapshots = None if args.no_snapshots or args.replay else SnapshotStore(args.snapshots)
+    scraper = CurbEpisodeScraper(requests_per_second=args.requests_per_second,
+                                 max_workers=args.max_workers, cache=stores.cache,
+                                 parse_workers=args.parse_workers, title_id=args.title_id,
+                                 archive=stores.archive, snapshots=snapshots, metrics=stores.metrics,
+                                 dead_letters=stores.dead_letters)
+    
+    if args.with_credits or args.incremental:
+        known_credits = load_csv_episodes('curb_episodes_with_credits.csv') if args.incremental else None
+        print("Scraping Curb Your Enthusiasm episodes and credits...")
+        if scraper.save_with_credits(scraper.stream_with_credits(args.seasons, known_credits)):
+            if args.incremental:
+                # A refresh also keeps the listing files current, in the layout a plain scrape writes
+                listings = [episode.replace(director=None, writer=None) for episode in scraper.episodes]
+                scraper.save_to_csv(episodes=listings)
+                scraper.save_to_json(episodes=listings)
+            scraper.print_summary()
+        else:
+            print("No episodes were saved. Please check the logs for errors.")
+        close_fetch_stores(scraper, stores, args.metrics)
+        exit_on_failed_pages(scraper, '--incremental' if args.incremental else '--with-credits')
+        return
     
     print("Starting Curb Your Enthusiasm episode scraping...")
     print("This may take a few minutes to complete...")
     
     # Scrape all seasons
-    episodes = scraper.scrape_all_seasons(12)
+    episodes = scraper.scrape_all_seasons(args.seasons)
     
-    if episodes:
+    if episodes and not scraper.missing_seasons:
         # Save data in multiple formats
         scraper.save_to_csv()
         scraper.save_to_json()
@@ -313,8 +370,12 @@ def main():
         print("  - curb_episodes.csv")
         print("  - curb_episodes.json")
     else:
-        print("No episodes were scraped. Please check the logs for errors.")
+        print("No episodes were saved. Please check the logs for errors.")
+        
+    close_fetch_stores(scraper, stores, args.metrics)
+    exit_on_failed_pages(scraper, '')
 
 
 if __name__ == "__main__":
+    configure_logging()
     main() 
\ No newline at end of file
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Inverted full-text index over episode titles, descriptions and credits
+
+Text is normalised (accents stripped, lower-cased, apostrophes dropped) and
+split into alphanumeric tokens. Every token maps to a postings list of
+doc_id * 16 + field mask, so one integer says which episode matched and in
+which fields. Terms are kept sorted, which makes prefix lookups a binary
+search: each query token matches every term it is a prefix of, and an
+episode must match all query tokens.
+
+The same index is written to <basename>.search.json for the page, which
+runs the same tokenizer and lookup in JavaScript, and is queried in Python
+by the server's /api/search endpoint. In the file each postings list is
+delta-encoded (first value, then differences), which keeps the numbers short.
+
+    python3 search_index.py [curb_episodes_with_credits.csv]
+"""
+
+import bisect
+import json
+import logging
+import re
+import sys
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from curb.config import configure_logging
+from dataset_io import iter_csv, write_if_changed
+from episode import Episode
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_BASENAME = 'curb_episodes_with_credits'
+
+# Field order defines the mask bits; earlier fields rank higher
+SEARCH_FIELDS = ['title', 'director', 'writer', 'description']
+FIELD_BITS = {field: 1 << bit for bit, field in enumerate(SEARCH_FIELDS)}
+FIELD_SHIFT = 4
+
+_APOSTROPHES_RE = re.compile(r"['’]")
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into normalised search tokens; the page's tokenize() must match this
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return _TOKEN_RE.findall(_APOSTROPHES_RE.sub('', text))
+
+
+class SearchIndex:
+    """
+    Sorted term list with per-term postings over a list of episodes
+    """
+
+    def __init__(self, terms: List[str], postings: List[List[int]]):
+        self.terms = terms
+        self.postings = postings
+
+    @classmethod
+    def build(cls, episodes: Iterable[Episode]) -> 'SearchIndex':
+        masks: Dict[str, Dict[int, int]] = {}
+        for doc_id, episode in enumerate(episodes):
+            for field in SEARCH_FIELDS:
+                for token in tokenize(getattr(episode, field)):
+                    docs = masks.setdefault(token, {})
+                    docs[doc_id] = docs.get(doc_id, 0) | FIELD_BITS[field]
+        terms = sorted(masks)
+        postings = [[(doc_id << FIELD_SHIFT) | mask for doc_id, mask in sorted(masks[term].items())]
+                    for term in terms]
+        return cls(terms, postings)
+
+    def _prefix_matches(self, prefix: str) -> Dict[int, int]:
+        """
+        doc_id -> field mask for every term starting with prefix
+        """
+        matches: Dict[int, int] = {}
+        position = bisect.bisect_left(self.terms, prefix)
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            for posting in self.postings[position]:
+                doc_id = posting >> FIELD_SHIFT
+                matches[doc_id] = matches.get(doc_id, 0) | (posting & ((1 << FIELD_SHIFT) - 1))
+            position += 1
+        return matches
+
+    def search(self, query: str) -> List[int]:
+        """
+        Doc ids matching every query token (as a prefix), best matches first
+
+        Episodes matching in their title rank first, then director, writer and
+        description; ties keep dataset order.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        combined: Optional[Dict[int, int]] = None
+        # Rarest-looking (longest) tokens first keeps the running intersection small
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matches = self._prefix_matches(token)
+            if combined is None:
+                combined = matches
+            else:
+                combined = {doc_id: combined[doc_id] | mask for doc_id, mask in matches.items() if doc_id in combined}
+            if not combined:
+                return []
+        return sorted(combined, key=lambda doc_id: (_rank(combined[doc_id]), doc_id))
+
+    def to_json(self, keys: List[List[int]]) -> Dict:
+        """
+        The page's index document; keys gives [season, episode] for each doc id
+        """
+        return {
+            'version': FORMAT_VERSION,
+            'fields': SEARCH_FIELDS,
+            'field_shift': FIELD_SHIFT,
+            'keys': keys,
+            'terms': self.terms,
+            'postings': [[values[0]] + [b - a for a, b in zip(values, values[1:])] for values in self.postings],
+        }
+
+
+def _rank(mask: int) -> int:
+    # Index of the lowest set bit: 0 for a title match, 1 for director, ...
+    return (mask & -mask).bit_length()
+
+
+def write_search_index(episodes: Iterable[Episode], basename: str = DEFAULT_BASENAME) -> bool:
+    """
+    Write <basename>.search.json, leaving it alone if unchanged. Returns True if written.
+    """
+    episodes = list(episodes)
+    if not episodes:
+        logger.warning("No episodes to index")
+        return False
+    index = SearchIndex.build(episodes)
+    document = index.to_json([[episode.season, episode.episode] for episode in episodes])
+    path = f'{basename}.search.json'
+    written = write_if_changed(path, json.dumps(document, ensure_ascii=False, separators=(',', ':')) + '\n')
+    if written:
+        logger.info(f"Saved search index of {len(index.terms)} terms over {len(episodes)} episodes to {path}")
+    return written
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else f'{DEFAULT_BASENAME}.csv'
+    basename = csv_path[:-4] if csv_path.endswith('.csv') else csv_path
+    write_search_index(iter_csv(csv_path), basename)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
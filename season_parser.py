@@ -0,0 +1,164 @@
+"""
+Targeted parsing of IMDB season listing pages
+
+Season pages are large, but only the episode cards matter. A SoupStrainer
+makes the lxml tree builder materialise just the
+article.episode-item-wrapper elements and skip everything else. Selectors
+and the title regex are compiled once at import time.
+"""
+
+import logging
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from episode import Episode, split_air_date
+
+logger = logging.getLogger(__name__)
+
+HTML_PARSER = 'lxml'
+
+CURB_TITLE_ID = 'tt0264235'
+SEASON_URL = 'https://www.imdb.com/title/{title_id}/episodes/?season={season}&ref_=ttep'
+SERIES_EPISODES_URL = 'https://www.imdb.com/title/{title_id}/episodes/'
+
+# Season tab links on an episodes page, e.g. href="/title/tt0264235/episodes/?season=12"
+SEASON_LINK_RE = re.compile(rb'/episodes/?\?(?:[^"\'<>\s]*?&(?:amp;)?)?season=(\d+)')
+
+
+def _class_token(name: str):
+    # Depending on the bs4 version, parse_only strainers see the raw
+    # space-separated class attribute rather than the split class list,
+    # so match the class as a whitespace-delimited token.
+    return re.compile(r'(?:^|\s)' + re.escape(name) + r'(?:\s|$)')
+
+
+# Only the episode cards are built into the tree
+EPISODE_CONTAINERS = SoupStrainer('article', class_=_class_token('episode-item-wrapper'))
+
+# Lookups inside a single card
+TITLE_LINK = SoupStrainer('a', class_=_class_token('ipc-title-link-wrapper'))
+AIR_DATE = SoupStrainer('span', class_=_class_token('sc-a388aa45-10'))
+RATING = SoupStrainer('span', class_=_class_token('ipc-rating-star--rating'))
+VOTE_COUNT = SoupStrainer('span', class_=_class_token('ipc-rating-star--voteCount'))
+DESCRIPTION = SoupStrainer('div', class_=_class_token('ipc-html-content-inner-div'))
+
+# Matches listing titles of the form "S1.E1 ∙ The Pants Tent"
+EPISODE_TITLE_RE = re.compile(r'S\d+\.E(\d+)\s*[∙·]\s*(.+)')
+
+
+def iter_episode_containers(content: bytes) -> Iterator:
+    """
+    Yield the episode card elements of a season page
+    """
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=EPISODE_CONTAINERS)
+    return iter(soup.find_all(EPISODE_CONTAINERS))
+
+
+def season_url(title_id: str, season: int) -> str:
+    return SEASON_URL.format(title_id=title_id, season=season)
+
+
+def parse_season_count(content: bytes) -> int:
+    """
+    Find the number of seasons from the season links on an episodes page
+
+    Returns 0 if the page has no season links.
+    """
+    return max((int(num) for num in SEASON_LINK_RE.findall(content)), default=0)
+
+
+def parse_episode_title(title_text: str) -> Tuple[Optional[int], str]:
+    """
+    Split "S1.E1 ∙ The Pants Tent" into (1, 'The Pants Tent')
+
+    Titles that do not match come back unchanged with no episode number.
+    """
+    match = EPISODE_TITLE_RE.search(title_text)
+    if match:
+        return int(match.group(1)), match.group(2).strip()
+    return None, title_text
+
+
+def extract_episode_data(container, season_num: int,
+                         episode_urls: Optional[Dict[Tuple[int, int], str]] = None) -> Optional[Episode]:
+    """
+    Extract episode data from a container element
+
+    If episode_urls is given, the episode page link is recorded in it under
+    (season, episode).
+    """
+    try:
+        # Episode title and number
+        title_elem = container.find(TITLE_LINK)
+        if not title_elem:
+            return None
+
+        title_text = title_elem.get_text(strip=True)
+        episode_url = title_elem.get('href')
+
+        # Extract episode number and title from format "S1.E1 ∙ The Pants Tent"
+        episode_num, title = parse_episode_title(title_text)
+
+        # Air date
+        air_date_elem = container.find(AIR_DATE)
+        air_date, air_date_text = split_air_date(air_date_elem.get_text(strip=True) if air_date_elem else None)
+
+        # Rating
+        rating_elem = container.find(RATING)
+        rating = None
+        if rating_elem:
+            rating_text = rating_elem.get_text(strip=True)
+            try:
+                rating = float(rating_text)
+            except ValueError:
+                pass
+
+        # Vote count
+        votes_elem = container.find(VOTE_COUNT)
+        votes = None
+        if votes_elem:
+            votes_text = votes_elem.get_text(strip=True)
+            # Remove parentheses and convert to number
+            votes_text = votes_text.replace('(', '').replace(')', '').replace(',', '').replace(' ', '')
+            try:
+                if 'K' in votes_text:
+                    votes = int(float(votes_text.replace('K', '')) * 1000)
+                elif 'M' in votes_text:
+                    votes = int(float(votes_text.replace('M', '')) * 1000000)
+                else:
+                    votes = int(votes_text)
+            except (ValueError, TypeError):
+                pass
+
+        # Description/plot
+        description_elem = container.find(DESCRIPTION)
+        description = description_elem.get_text(strip=True) if description_elem else None
+
+        if episode_urls is not None and episode_num is not None and episode_url:
+            episode_urls[(season_num, episode_num)] = episode_url
+
+        # Director and writer come from the episode page in the credits pass
+        return Episode(season_num, episode_num, title, air_date, rating, votes, description,
+                       air_date_text=air_date_text)
+
+    except Exception as e:
+        logger.error(f"Error extracting episode data: {e}")
+        return None
+
+
+def parse_season_page(content: bytes, season_num: int) -> Tuple[List[Episode], Dict[Tuple[int, int], str]]:
+    """
+    Parse a season listing page into episode records and their page links
+
+    Takes and returns only picklable data, so it can run in a worker process.
+    Returns (episodes, {(season, episode): episode_url}).
+    """
+    episode_urls: Dict[Tuple[int, int], str] = {}
+    episodes = []
+    for container in iter_episode_containers(content):
+        episode_data = extract_episode_data(container, season_num, episode_urls)
+        if episode_data:
+            episodes.append(episode_data)
+    return episodes, episode_urls
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Append-only history of episode ratings and vote counts
+
+Every scrape appends a snapshot to a SQLite file. A row is stored only
+when an episode's rating, votes or title differs from its latest stored
+row, so a daily refresh of an unchanged series costs one row in runs and
+nothing else. Rows are never updated or deleted. An episode's value at
+any time is its latest row at or before that time.
+
+Both queries are answered from the (series, season, episode, scraped_at)
+index. Each episode's latest row is found in one pass over the series'
+index entries, which hold every column the lookup needs. Only those rows
+are then read from the table, each with one index seek, as are the
+baseline values for movers. No query reads the older rows themselves.
+
+    python3 snapshot_store.py history 2 7              # votes and rating over time for S2E7
+    python3 snapshot_store.py movers --since 2025-01-01 --limit 10
+"""
+
+import argparse
+import datetime
+import logging
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from curb.config import configure_logging
+from episode import Episode
+from season_parser import CURB_TITLE_ID
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = 'snapshots.sqlite'
+MOVER_METRICS = ('votes', 'rating')
+
+# Each episode's latest scraped_at, read from the covering snapshots_key index alone,
+# and the join that fetches just those rows from the table
+LATEST_CTE = '''
+    WITH latest AS (
+        SELECT season, episode, MAX(scraped_at) AS scraped_at FROM snapshots
+        WHERE series = :series
+        GROUP BY season, episode
+    )
+'''
+LATEST_JOIN = '''
+    ON s.series = :series AND s.season = latest.season AND s.episode = latest.episode
+        AND s.scraped_at = latest.scraped_at
+'''
+
+
+class Snapshot(NamedTuple):
+    scraped_at: str
+    rating: Optional[float]
+    votes: Optional[int]
+    title: Optional[str]
+
+
+class Mover(NamedTuple):
+    season: int
+    episode: int
+    title: Optional[str]
+    before: Optional[float]
+    after: Optional[float]
+    change: float
+
+
+def utc_timestamp() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+
+class SnapshotStore:
+    """
+    SQLite file of per-episode rating and vote snapshots, keyed by series
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                series TEXT NOT NULL,
+                scraped_at TEXT NOT NULL,
+                episodes INTEGER NOT NULL,
+                changed INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                series TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                episode INTEGER NOT NULL,
+                scraped_at TEXT NOT NULL,
+                rating REAL,
+                votes INTEGER,
+                title TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS snapshots_key
+            ON snapshots (series, season, episode, scraped_at)
+        ''')
+        self.conn.commit()
+
+    def latest(self, series: str) -> Dict[Tuple[int, int], Snapshot]:
+        """
+        (season, episode) -> latest Snapshot of every episode of a series
+        """
+        rows = self.conn.execute(f'''
+            {LATEST_CTE}
+            SELECT s.season, s.episode, s.scraped_at, s.rating, s.votes, s.title
+            FROM latest JOIN snapshots AS s {LATEST_JOIN}
+        ''', {'series': series})
+        return {(season, episode): Snapshot(*values) for season, episode, *values in rows}
+
+    def record(self, series: str, episodes: Iterable[Episode], scraped_at: Optional[str] = None) -> int:
+        """
+        Append one run's values, skipping episodes whose values are unchanged.
+        Returns the number of rows added.
+        """
+        scraped_at = scraped_at or utc_timestamp()
+        latest = self.latest(series)
+        rows = []
+        seen = 0
+        for episode in episodes:
+            if episode.episode is None:
+                continue
+            seen += 1
+            previous = latest.get(episode.key)
+            if previous and (previous.rating, previous.votes, previous.title) == (episode.rating, episode.votes, episode.title):
+                continue
+            rows.append((series, episode.season, episode.episode, scraped_at,
+                         episode.rating, episode.votes, episode.title))
+        with self.conn:
+            # OR IGNORE: a second record() within the same second keeps the first values
+            self.conn.executemany('INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute('INSERT INTO runs (series, scraped_at, episodes, changed) VALUES (?, ?, ?, ?)',
+                              (series, scraped_at, seen, len(rows)))
+        logger.info(f"Recorded snapshot of {series}: {len(rows)} of {seen} episodes changed")
+        return len(rows)
+
+    def history(self, series: str, season: int, episode: int) -> List[Snapshot]:
+        """
+        Every stored value of one episode, oldest first
+        """
+        rows = self.conn.execute('''
+            SELECT scraped_at, rating, votes, title FROM snapshots
+            WHERE series = ? AND season = ? AND episode = ?
+            ORDER BY scraped_at
+        ''', (series, season, episode))
+        return [Snapshot(*row) for row in rows]
+
+    def movers(self, series: str, since: str, metric: str = 'votes', limit: int = 10) -> List[Mover]:
+        """
+        Episodes whose metric changed most between since and their latest snapshot
+
+        since is an ISO date or timestamp; the baseline is the value in effect
+        just before it. Episodes first seen after since are measured from their
+        first snapshot.
+        """
+        if metric not in MOVER_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(MOVER_METRICS)}")
+        rows = self.conn.execute(f'''
+            {LATEST_CTE}
+            SELECT s.season, s.episode, s.title, s.{metric},
+                COALESCE(
+                    (SELECT {metric} FROM snapshots
+                     WHERE series = s.series AND season = s.season AND episode = s.episode AND scraped_at < :since
+                     ORDER BY scraped_at DESC LIMIT 1),
+                    (SELECT {metric} FROM snapshots
+                     WHERE series = s.series AND season = s.season AND episode = s.episode
+                     ORDER BY scraped_at LIMIT 1)
+                )
+            FROM latest JOIN snapshots AS s {LATEST_JOIN}
+            WHERE latest.scraped_at >= :since
+        ''', {'series': series, 'since': since})
+        movers = [Mover(season, episode, title, before, after, round(after - before, 2))
+                  for season, episode, title, after, before in rows
+                  if after is not None and before is not None and after != before]
+        movers.sort(key=lambda mover: (-abs(mover.change), mover.season, mover.episode))
+        return movers[:limit]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def main():
+    """
+    Print an episode's history or the biggest movers from the snapshot store
+    """
+    parser = argparse.ArgumentParser(description="Query the rating and vote snapshot history")
+    parser.add_argument('--db', default=DEFAULT_SNAPSHOT_PATH, help=f"snapshot database (default: {DEFAULT_SNAPSHOT_PATH})")
+    parser.add_argument('--title-id', default=CURB_TITLE_ID, help=f"IMDB title id of the series (default: {CURB_TITLE_ID})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    history_parser = subparsers.add_parser('history', help="votes and rating over time for one episode")
+    history_parser.add_argument('season', type=int)
+    history_parser.add_argument('episode', type=int)
+
+    movers_parser = subparsers.add_parser('movers', help="episodes that changed most since a date")
+    movers_parser.add_argument('--since', required=True, help="ISO date or timestamp, e.g. 2025-01-01")
+    movers_parser.add_argument('--metric', choices=MOVER_METRICS, default='votes')
+    movers_parser.add_argument('--limit', type=int, default=10)
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.db)
+    if args.command == 'history':
+        for snapshot in store.history(args.title_id, args.season, args.episode):
+            print(f"{snapshot.scraped_at}  rating {snapshot.rating}  votes {snapshot.votes}")
+    else:
+        for mover in store.movers(args.title_id, args.since, args.metric, args.limit):
+            print(f"S{mover.season}E{mover.episode} - {mover.title}: {mover.before} -> {mover.after} ({mover.change:+g})")
+    store.close()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
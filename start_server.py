@@ -1,34 +1,343 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server to serve the Curb Your Enthusiasm visualization
+HTTP server for the Curb Your Enthusiasm visualization
+
+Text assets (the page, data files, scripts) are loaded and compressed once,
+in the background while the server already listens, and reloaded only when
+their file changes. They are served with
+gzip or brotli, strong ETags, If-None-Match/304, Range and Cache-Control.
+Other files fall back to the standard static handler. A threaded server
+keeps one slow client from blocking everyone else. /api/episodes and
+/api/seasons answer queries over the dataset (see episode_api.py).
+
+    python3 start_server.py [--host HOST] [--port PORT] [--no-browser]
 """
 
+import argparse
+import functools
+import gzip
+import hashlib
 import http.server
-import socketserver
-import webbrowser
+import json
+import mimetypes
 import os
+import re
 import sys
+import threading
+import webbrowser
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from episode_api import EpisodeApi
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DEFAULT_HOST = ''
+DEFAULT_PORT = 8000
+PAGE = 'curb_episodes_visualization.html'
+DATA_FILE = 'curb_episodes_with_credits.csv'
+
+# Extensions worth keeping compressed in memory
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.json', '.csv', '.ndjson', '.svg', '.txt', '.md'}
+# Compressing tiny files costs more in headers than it saves
+MIN_COMPRESS_SIZE = 256
+# Brotli's best quality is slow on large files (such as debug page dumps), so those get a faster level
+BROTLI_MAX_QUALITY_SIZE = 1024 * 1024
+# The page and data change between scrapes, so clients revalidate them every time (cheap with ETags)
+REVALIDATE = 'no-cache'
+# Everything else may be reused for an hour
+SHORT_LIVED = 'public, max-age=3600'
+REVALIDATED_EXTENSIONS = {'.html', '.json', '.csv', '.ndjson'}
+# Content-hashed names written by build_site.py (app.3f9c2a1b7e.js) never change content
+IMMUTABLE = 'public, max-age=31536000, immutable'
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class Asset(NamedTuple):
+    mtime_ns: int
+    size: int
+    content_type: str
+    cache_control: str
+    # encoding ('identity', 'gzip', 'br') -> (body, etag)
+    variants: Dict[str, Tuple[bytes, str]]
+
+
+def load_asset(path: str) -> Asset:
+    """
+    Read a file and build its identity, gzip and (when available) brotli variants
+    """
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        body = f.read()
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    variants = {'identity': (body, f'"{digest}"')}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            variants['gzip'] = (compressed, f'"{digest}-gz"')
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11 if len(body) <= BROTLI_MAX_QUALITY_SIZE else 6)
+            if len(compressed) < len(body):
+                variants['br'] = (compressed, f'"{digest}-br"')
+
+    extension = os.path.splitext(path)[1].lower()
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or extension in ('.json', '.ndjson', '.js'):
+        content_type += '; charset=utf-8'
+    if HASHED_NAME_RE.search(os.path.basename(path)):
+        cache_control = IMMUTABLE
+    else:
+        cache_control = REVALIDATE if extension in REVALIDATED_EXTENSIONS else SHORT_LIVED
+    return Asset(stat.st_mtime_ns, stat.st_size, content_type, cache_control, variants)
+
+
+class AssetStore:
+    """
+    In-memory, precompressed copies of the compressible files under a directory
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.assets: Dict[str, Asset] = {}
+        self.lock = threading.Lock()
+
+    def preload(self) -> int:
+        """
+        Load and compress every compressible top-level file. Returns the number loaded.
+        """
+        for name in sorted(os.listdir(self.root)):
+            if self.is_compressible(name) and os.path.isfile(os.path.join(self.root, name)):
+                self.get(os.path.join(self.root, name))
+        return len(self.assets)
+
+    @staticmethod
+    def is_compressible(path: str) -> bool:
+        return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+    def get(self, path: str) -> Optional[Asset]:
+        """
+        Return the asset for an absolute file path, reloading it if the file changed
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        asset = self.assets.get(path)
+        if asset is not None and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+            return asset
+        asset = load_asset(path)
+        with self.lock:
+            self.assets[path] = asset
+        return asset
+
+
+def choose_encoding(accept_encoding: str, variants: Dict) -> str:
+    """
+    Pick the best variant the client accepts: brotli, then gzip, then identity
+    """
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+
+def parse_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=start-end" range into an inclusive (start, end) pair
+
+    Returns None for unsupported forms (e.g. multiple ranges), which are
+    answered with the full body. Raises ValueError for an unsatisfiable range.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        return max(0, length - suffix), length - 1
+    start = int(first)
+    end = min(int(last), length - 1) if last else length - 1
+    if start >= length or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
 
-def start_server():
-    """Start a simple HTTP server on port 8000"""
-    PORT = 8000
-    
-    # Change to the directory containing the files
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
-    # Create a simple HTTP request handler
-    Handler = http.server.SimpleHTTPRequestHandler
-    
-    # Create the server
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Weak comparison for If-None-Match, as RFC 9110 requires
+    """
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+class VisualizationHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Static handler that serves compressible files from the precompressed asset store
+    """
+
+    # Keep-alive lets a page load reuse one connection for the page and its data
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, *args, store: AssetStore, api: EpisodeApi, **kwargs):
+        # The base class handles the request inside __init__, so these must be set first
+        self.store = store
+        self.api = api
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if not (self._send_api(head=False) or self._send_asset(head=False)):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not (self._send_api(head=True) or self._send_asset(head=True)):
+            super().do_HEAD()
+
+    def _send_api(self, head: bool) -> bool:
+        """
+        Answer /api/ requests; returns False for any other path
+        """
+        url = urlsplit(self.path)
+        if not url.path.startswith('/api/'):
+            return False
+        status, payload = self.api.handle(url.path.rstrip('/'), parse_qs(url.query))
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        encoding = 'identity'
+        if len(body) >= MIN_COMPRESS_SIZE:
+            encoding = choose_encoding(self.headers.get('Accept-Encoding', ''), {'gzip': None})
+            if encoding == 'gzip':
+                body = gzip.compress(body, compresslevel=6)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+        return True
+
+    def _send_asset(self, head: bool) -> bool:
+        """
+        Answer the request from the asset store; returns False if the path is not a stored asset
+        """
+        url_path = urlsplit(self.path).path
+        path = self.translate_path(url_path)
+        if os.path.isdir(path):
+            # Let the base class redirect "/dir" to "/dir/" and list directories
+            if not url_path.endswith('/'):
+                return False
+            path = os.path.join(path, 'index.html')
+        if not self.store.is_compressible(path):
+            return False
+        asset = self.store.get(path)
+        if asset is None:
+            return False
+
+        range_header = self.headers.get('Range')
+        # Byte ranges refer to the identity body, so a range request is never compressed
+        encoding = 'identity' if range_header else choose_encoding(self.headers.get('Accept-Encoding', ''), asset.variants)
+        body, etag = asset.variants[encoding]
+
+        if etag_matches(self.headers.get('If-None-Match', ''), etag):
+            self.send_response(304)
+            self._send_cache_headers(asset, etag)
+            self.end_headers()
+            return True
+
+        status, start, end = 200, 0, len(body) - 1
+        if_range = self.headers.get('If-Range')
+        if range_header and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, len(body))
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return True
+            if byte_range is not None:
+                status, (start, end) = 206, byte_range
+
+        self.send_response(status)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+        self._send_cache_headers(asset, etag)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body[start:end + 1] if status == 206 else body)
+        return True
+
+    def _send_cache_headers(self, asset: Asset, etag: str) -> None:
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', asset.cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Last-Modified', self.date_time_string(asset.mtime_ns // 1_000_000_000))
+
+
+def default_directory() -> str:
+    """
+    The checkout this script is in, or the current directory when installed without the page
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    return here if os.path.exists(os.path.join(here, PAGE)) else os.getcwd()
+
+
+def start_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, open_browser: bool = True,
+                 directory: Optional[str] = None, data_file: str = DATA_FILE):
+    """Start the threaded visualization server"""
+    directory = os.path.abspath(directory or default_directory())
+
+    store = AssetStore(directory)
+    api = EpisodeApi(os.path.join(directory, data_file))
+    try:
+        # Build the query indexes up front rather than on the first API request
+        api.index()
+    except FileNotFoundError:
+        print(f"⚠️  {data_file} not found; /api/ endpoints will return 503 until it exists")
+
+    handler = functools.partial(VisualizationHandler, directory=directory, store=store, api=api)
+
+    with http.server.ThreadingHTTPServer((host, port), handler) as httpd:
+        # Compressing every asset takes longer than starting up, so it happens while the
+        # server already listens; a request for an asset not loaded yet loads that one first
+        threading.Thread(target=store.preload, name='preload', daemon=True).start()
+        # A build_site.py output directory has the page as index.html
+        page = PAGE if os.path.exists(os.path.join(directory, PAGE)) else ''
+        url = f'http://{host or "localhost"}:{httpd.server_address[1]}/{page}'
         print(f"🎭 Curb Your Enthusiasm Episode Visualization Server")
-        print(f"📊 Server running at: http://localhost:{PORT}")
-        print(f"🌐 Opening visualization in browser...")
+        print(f"📊 Server running at: {url}")
+        print(f"🗜️  Precompressing assets in the background (gzip{', brotli' if brotli is not None else ''})")
         print(f"⏹️  Press Ctrl+C to stop the server")
-        
-        # Automatically open the browser
-        webbrowser.open(f'http://localhost:{PORT}/curb_episodes_visualization.html')
-        
+
+        if open_browser:
+            print(f"🌐 Opening visualization in browser...")
+            webbrowser.open(url)
+
         # Start serving files
         try:
             httpd.serve_forever()
@@ -36,5 +345,19 @@ def start_server():
             print("\n🛑 Server stopped by user")
             sys.exit(0)
 
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Serve the Curb Your Enthusiasm visualization")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="interface to bind (default: all interfaces)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--no-browser', action='store_true', help="do not open a browser, e.g. when running headless")
+    parser.add_argument('--directory',
+                        help="directory to serve (default: the directory of this script, or the current one when installed)")
+    parser.add_argument('--data', default=DATA_FILE,
+                        help=f"dataset CSV behind /api/, relative to the directory (default: {DATA_FILE})")
+    args = parser.parse_args(argv)
+    start_server(args.host, args.port, not args.no_browser, args.directory, args.data)
+
+
 if __name__ == "__main__":
-    start_server() 
\ No newline at end of file
+    main()
@@ -0,0 +1,61 @@
+"""
+Resuming a checkpoint journal after a run killed mid-write
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from checkpoint import CheckpointJournal
+from episode import Episode
+
+
+def episode(number: int) -> Episode:
+    return Episode.from_dict({'season': 1, 'episode': number, 'title': f'Episode {number}'})
+
+
+class CheckpointJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'journal.ndjson')
+        journal = CheckpointJournal(self.path)
+        journal.append(episode(1))
+        journal.append(episode(2))
+        journal.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def resume_after(self, tail: str):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(tail)
+        journal = CheckpointJournal(self.path)
+        done = journal.completed_keys()
+        journal.append(episode(3))
+        journal.close()
+        return done, [entry.key for entry in journal.iter_episodes()]
+
+    def test_torn_line_is_dropped_before_appending(self):
+        done, keys = self.resume_after('{"season": 1, "epi')
+        self.assertEqual(done, {(1, 1), (1, 2)})
+        self.assertEqual(keys, [(1, 1), (1, 2), (1, 3)])
+
+    def test_complete_row_without_newline_is_kept(self):
+        done, keys = self.resume_after('{"season": 1, "episode": 4}')
+        self.assertEqual(done, {(1, 1), (1, 2), (1, 4)})
+        self.assertEqual(keys, [(1, 1), (1, 2), (1, 4), (1, 3)])
+
+    def test_corrupt_line_before_the_end_raises(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"season": 1, "epi\n{"season": 1, "episode": 3}\n')
+        with self.assertRaises(ValueError):
+            list(CheckpointJournal(self.path).iter_episodes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Crawl a series from saved pages and export it, end to end
+
+The fetcher is replaced by one that answers from the checked-in pages: an
+empty series page (one season), the synthetic season listing in
+benchmarks/fixtures/ and the saved episode page for every episode.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(TESTS_DIR, '..')
+sys.path.insert(0, ROOT_DIR)
+
+from credit_parser import extract_credits, primary_credits
+from crawler import SeriesCrawler
+from dataset_io import iter_csv
+from season_parser import parse_season_page
+
+SEASON_PAGE_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'fixtures', 'season_page.html')
+EPISODE_PAGE_PATH = os.path.join(ROOT_DIR, 'episode_page.html')
+TITLE_ID = 'tt0264235'
+
+
+class SavedPageFetcher:
+    """
+    Stands in for Fetcher, answering every request from the saved pages
+    """
+
+    def __init__(self):
+        with open(SEASON_PAGE_PATH, 'rb') as f:
+            self.season_page = f.read()
+        with open(EPISODE_PAGE_PATH, 'rb') as f:
+            self.episode_page = f.read()
+
+    def fetch(self, url: str) -> bytes:
+        if 'season=' in url:
+            return self.season_page
+        if url.rstrip('/').endswith('/episodes'):
+            # No season tabs: the crawler treats the series as one season
+            return b'<html><body></body></html>'
+        return self.episode_page
+
+
+class CrawlExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'crawl.sqlite')
+        self.csv_path = os.path.join(self.tmp.name, 'export.csv')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_crawl_then_export_round_trip(self):
+        fetcher = SavedPageFetcher()
+        crawler = SeriesCrawler(self.db_path, 'test', fetcher)
+        try:
+            crawler.seed([TITLE_ID])
+            crawler.run(idle_wait=0)
+            exported = crawler.export(TITLE_ID, self.csv_path)
+        finally:
+            crawler.close()
+
+        listed, _ = parse_season_page(fetcher.season_page, 1)
+        director, writer = primary_credits(extract_credits(fetcher.episode_page))
+        self.assertEqual(exported, len(listed))
+        rows = list(iter_csv(self.csv_path))
+        self.assertEqual([(row.season, row.episode, row.title, row.air_date, row.rating, row.votes)
+                          for row in rows],
+                         [(episode.season, episode.episode, episode.title, episode.air_date, episode.rating,
+                           episode.votes) for episode in listed])
+        self.assertTrue(all(row.director == director and row.writer == writer for row in rows))
+        self.assertFalse(os.path.exists(self.csv_path + '.tmp'))
+
+    def test_refresh_requeues_finished_pages(self):
+        fetcher = SavedPageFetcher()
+        crawler = SeriesCrawler(self.db_path, 'test', fetcher)
+        try:
+            crawler.seed([TITLE_ID])
+            crawled = crawler.run(idle_wait=0)
+            # Seeding again is a no-op, and recently finished pages are not yet due
+            crawler.seed([TITLE_ID])
+            self.assertEqual(crawler.run(idle_wait=0), 0)
+            self.assertEqual(crawler.refresh([TITLE_ID], older_than=3600), 0)
+            self.assertEqual(crawler.refresh([TITLE_ID]), crawled)
+            self.assertEqual(crawler.queue.counts(), {'pending': crawled})
+            self.assertEqual(crawler.run(idle_wait=0), crawled)
+            self.assertEqual(crawler.export(TITLE_ID, self.csv_path), 10)
+            # A series that was never seeded is seeded by refreshing it
+            self.assertEqual(crawler.refresh(['tt0000000']), 1)
+        finally:
+            crawler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
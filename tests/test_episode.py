@@ -0,0 +1,51 @@
+"""
+Episode codecs: full and partial air dates through CSV and JSON, and hashing
+
+    python3 -m unittest discover tests
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dataset_io import iter_csv, render_csv
+from episode import FIELDNAMES, Episode
+
+
+class EpisodeAirDateTest(unittest.TestCase):
+    def round_trip_csv(self, episodes):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'episodes.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(render_csv(episodes))
+            return list(iter_csv(path))
+
+    def test_full_date_is_parsed(self):
+        episode = Episode.from_dict({'season': 1, 'episode': 1, 'air_date': 'Sun, Oct 22, 2000'})
+        self.assertEqual(episode.air_date, datetime.date(2000, 10, 22))
+        self.assertIsNone(episode.air_date_text)
+        self.assertEqual(episode.to_json_dict()['air_date'], '2000-10-22')
+
+    def test_partial_dates_survive_csv_and_json(self):
+        episodes = [Episode.from_dict({'season': 13, 'episode': number, 'air_date': text})
+                    for number, text in enumerate(['2000', 'Oct 2000', ''], 1)]
+        self.assertEqual([episode.air_date for episode in episodes], [None, None, None])
+        self.assertEqual([episode.air_date_text for episode in episodes], ['2000', 'Oct 2000', None])
+        self.assertEqual(self.round_trip_csv(episodes), episodes)
+        self.assertEqual([Episode.from_dict(episode.to_json_dict()) for episode in episodes], episodes)
+        self.assertEqual(episodes[1].to_csv_values()[FIELDNAMES.index('air_date')], 'Oct 2000')
+
+    def test_episodes_are_unhashable(self):
+        episode = Episode(1, 1, 'The Pants Tent')
+        self.assertEqual(episode, episode.replace())
+        with self.assertRaises(TypeError):
+            hash(episode)
+        self.assertEqual({episode.key: episode}[(1, 1)], episode)
+
+
+if __name__ == '__main__':
+    unittest.main()
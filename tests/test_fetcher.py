@@ -0,0 +1,81 @@
+"""
+Fetcher retries and the retry counts they leave in the run metrics
+
+The session is replaced by one that fails a set number of times per URL
+before answering, so no network is needed.
+
+    python3 -m unittest discover tests
+"""
+
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+
+from fetcher import Fetcher
+from metrics import RunMetrics
+from retry import RetryPolicy
+
+EPISODE_URL = 'https://www.imdb.com/title/tt0000001/'
+SEASON_URL = 'https://www.imdb.com/title/tt0264235/episodes/?season=1'
+
+
+class FlakySession:
+    """
+    Stands in for requests.Session: each URL fails failures[url] times with a connection error, then answers
+    """
+
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append(url)
+        if self.failures.get(url, 0) > 0:
+            self.failures[url] -= 1
+            raise requests.ConnectionError(f"connection refused: {url}")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'<html></html>'
+        response.url = url
+        response.elapsed = datetime.timedelta(0)
+        return response
+
+    def close(self):
+        pass
+
+
+class FetcherRetryMetricsTest(unittest.TestCase):
+    def fetch_all(self, failures):
+        session = FlakySession(failures)
+        metrics = RunMetrics()
+        fetcher = Fetcher(requests_per_second=1000, session=session, metrics=metrics,
+                          retry_policy=RetryPolicy(max_attempts=4, base_delay=0.0))
+        try:
+            for url in (EPISODE_URL, SEASON_URL):
+                fetcher.fetch(url)
+        finally:
+            fetcher.close()
+        return session, metrics
+
+    def test_retry_total_counts_each_retry_once(self):
+        session, metrics = self.fetch_all({EPISODE_URL: 3, SEASON_URL: 1})
+        self.assertEqual(len(session.calls), 6)
+        report = metrics.report()
+        self.assertEqual(report['totals']['requests'], 6)
+        self.assertEqual(report['totals']['retries'], 4)
+        self.assertEqual(report['page_types']['episode']['retries'], 3)
+        self.assertEqual(report['page_types']['season']['retries'], 1)
+        self.assertIn('curb_fetch_retries_total{page_type="episode"} 3', metrics.to_prometheus())
+
+    def test_no_retries_without_failures(self):
+        _, metrics = self.fetch_all({})
+        self.assertEqual(metrics.report()['totals']['retries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
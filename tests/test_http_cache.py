@@ -0,0 +1,44 @@
+"""
+HTTP cache byte budget when several processes share one cache file
+
+Two HttpCache objects on the same file stand in for two crawler workers.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from http_cache import HttpCache
+
+BODY_BYTES = 4096
+MAX_BYTES = 5 * BODY_BYTES
+
+
+class SharedCacheBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, 'cache.sqlite')
+        self.caches = [HttpCache(path, max_bytes=MAX_BYTES) for _ in range(2)]
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        self.tmp.cleanup()
+
+    def test_budget_counts_entries_written_by_other_workers(self):
+        for number in range(20):
+            # Random bytes do not compress, so each entry costs about BODY_BYTES
+            self.caches[number % 2].put(f'https://www.imdb.com/title/tt{number:07d}/', os.urandom(BODY_BYTES), {})
+        for cache in self.caches:
+            self.assertLessEqual(cache.stored_bytes(), MAX_BYTES)
+        self.assertIsNotNone(self.caches[0].get('https://www.imdb.com/title/tt0000019/'))
+        self.assertIsNone(self.caches[0].get('https://www.imdb.com/title/tt0000000/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
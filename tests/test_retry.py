@@ -0,0 +1,79 @@
+"""
+Circuit breaker states: closed, open and half-open with a single trial request
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from retry import CircuitBreaker, CircuitOpenError
+
+COOLDOWN = 0.05
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('www.imdb.com', threshold=2, cooldown=COOLDOWN)
+
+    def open_breaker(self):
+        self.breaker.record_failure('/a')
+        self.breaker.before_request()
+        self.breaker.record_failure('/b')
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+        time.sleep(COOLDOWN * 1.5)
+
+    def waiting_caller(self):
+        """
+        Start a second caller after the trial; returns its thread and a list that receives its outcome
+        """
+        outcome = []
+
+        def call():
+            try:
+                self.breaker.before_request()
+                outcome.append('passed')
+            except CircuitOpenError:
+                outcome.append('refused')
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        time.sleep(COOLDOWN / 2)
+        return thread, outcome
+
+    def test_repeated_failures_of_one_page_do_not_open(self):
+        for _ in range(5):
+            self.breaker.record_failure('/a')
+        self.breaker.before_request()
+
+    def test_half_open_lets_one_trial_through_and_closes_on_success(self):
+        self.open_breaker()
+        self.breaker.before_request()
+        thread, outcome = self.waiting_caller()
+        self.assertEqual(outcome, [], "a second caller must wait for the trial request")
+        self.breaker.record_success()
+        thread.join(1)
+        self.assertEqual(outcome, ['passed'])
+        self.breaker.before_request()
+
+    def test_failed_trial_reopens_for_another_cooldown(self):
+        self.open_breaker()
+        self.breaker.before_request()
+        thread, outcome = self.waiting_caller()
+        self.breaker.record_failure('/c')
+        thread.join(1)
+        self.assertEqual(outcome, ['refused'])
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+        time.sleep(COOLDOWN * 1.5)
+        self.breaker.before_request()
+
+
+if __name__ == '__main__':
+    unittest.main()
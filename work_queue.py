@@ -0,0 +1,163 @@
+"""
+Persistent SQLite-backed work queue with lease/retry semantics
+
+Jobs are keyed by URL, so the same page is only ever queued once; to fetch
+finished pages again, requeue() returns them to pending. A worker
+leases a job for a fixed time. If the worker dies, the lease expires and
+another worker picks the job up. Failed jobs are retried with exponential
+backoff and marked dead after max_attempts. Leasing runs inside a
+BEGIN IMMEDIATE transaction, so any number of processes can drain the
+same database file without two of them getting the same job. That holds
+on one machine or several, as long as the filesystem gives SQLite working
+locks.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BACKOFF = 30.0
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    url: str
+    payload: Dict
+    attempts: int
+
+
+class WorkQueue:
+    """
+    Job queue stored in a SQLite file, safe to share between processes
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # Autocommit mode; transactions are opened explicitly where needed
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                not_before REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                finished_at REAL
+            )
+        ''')
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(jobs)')}
+        if 'finished_at' not in columns:
+            # Queues created before requeue() existed; their finished jobs count as finished long ago
+            self.conn.execute('ALTER TABLE jobs ADD COLUMN finished_at REAL')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, not_before)')
+
+    def enqueue(self, kind: str, url: str, payload: Optional[Dict] = None) -> bool:
+        """
+        Queue a job unless its URL is already known. Returns True if it was added.
+        """
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO jobs (kind, url, payload) VALUES (?, ?, ?)',
+            (kind, url, json.dumps(payload or {}))
+        )
+        return cursor.rowcount == 1
+
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Job]:
+        """
+        Claim the next ready job, or an expired lease, for worker_id
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                '''SELECT id, kind, url, payload, attempts FROM jobs
+                   WHERE (status = ? AND not_before <= ?) OR (status = ? AND lease_expires < ?)
+                   ORDER BY id LIMIT 1''',
+                (PENDING, now, LEASED, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?',
+                (LEASED, worker_id, now + lease_seconds, row[0])
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        job_id, kind, url, payload, attempts = row
+        return Job(job_id, kind, url, json.loads(payload), attempts + 1)
+
+    def complete(self, job: Job, worker_id: str) -> None:
+        self.conn.execute(
+            'UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = NULL, finished_at = ? '
+            'WHERE id = ? AND lease_owner = ?',
+            (DONE, time.time(), job.id, worker_id)
+        )
+
+    def fail(self, job: Job, worker_id: str, error: str) -> None:
+        """
+        Release a failed job for a later retry, or mark it dead once out of attempts
+        """
+        if job.attempts >= self.max_attempts:
+            status, not_before = DEAD, 0
+            logger.error(f"Giving up on {job.url} after {job.attempts} attempts: {error}")
+        else:
+            status, not_before = PENDING, time.time() + self.retry_backoff * 2 ** (job.attempts - 1)
+        self.conn.execute(
+            'UPDATE jobs SET status = ?, not_before = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, '
+            'finished_at = ? WHERE id = ? AND lease_owner = ?',
+            (status, not_before, error, time.time() if status == DEAD else None, job.id, worker_id)
+        )
+
+    def requeue(self, finished_before: float, payload_match: Optional[Dict] = None) -> int:
+        """
+        Return done and dead jobs that finished before the given time to pending,
+        with a fresh attempt count. payload_match limits it to jobs whose payload
+        has those values. Returns the number requeued.
+        """
+        conditions = ['status IN (?, ?)', 'COALESCE(finished_at, 0) < ?']
+        params = [DONE, DEAD, finished_before]
+        for key, value in (payload_match or {}).items():
+            conditions.append('json_extract(payload, ?) = ?')
+            params += [f'$.{key}', value]
+        cursor = self.conn.execute(
+            'UPDATE jobs SET status = ?, attempts = 0, not_before = 0, last_error = NULL, finished_at = NULL '
+            f'WHERE {" AND ".join(conditions)}',
+            [PENDING] + params
+        )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def has_unfinished(self) -> bool:
+        """
+        True while any job is pending or leased
+        """
+        row = self.conn.execute('SELECT 1 FROM jobs WHERE status IN (?, ?) LIMIT 1', (PENDING, LEASED)).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        self.conn.close()